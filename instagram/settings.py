@@ -39,6 +39,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     # packages
     'rest_framework',
@@ -109,9 +110,22 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
+        'users.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.TokenAuthentication',
-        'rest_framework_simplejwt.authentication.JWTAuthentication'
-    ]
+    ],
+    # shared.throttling token buckets, "<throttle_scope>_<ip|user|target>": "<tokens>/<period>"
+    "DEFAULT_THROTTLE_RATES": {
+        "signup_ip": "20/hour",
+        "signup_target": "3/hour",
+        "login_ip": "30/min",
+        "login_target": "10/min",
+        "verify_ip": "30/min",
+        "verify_user": "10/min",
+        "new_verify_ip": "20/hour",
+        "new_verify_user": "5/hour",
+        "forgot_password_ip": "20/hour",
+        "forgot_password_target": "3/hour",
+    },
 }
 
 ROOT_URLCONF = 'instagram.urls'
@@ -149,6 +163,49 @@ DATABASES = {
     }
 }
 
+# Cache: OTP codes, throttling, revoked-token generations and auth lookups live here.
+# LocMemCache is per process: throttle limits would multiply by the number of workers and
+# revocations would not reach the other workers; `manage.py check --deploy` reports it (shared.checks).
+# Point CACHE_BACKEND at a shared backend (FileBasedCache on one host, memcached/redis across hosts).
+CACHES = {
+    'default': {
+        'BACKEND': config("CACHE_BACKEND", default="django.core.cache.backends.locmem.LocMemCache"),
+        'LOCATION': config("CACHE_LOCATION", default="instagram"),
+    }
+}
+
+# shared.response_cache: anonymous post reads; entries are fresh for TTL seconds and may be served
+# stale for STALE_TTL more while one request re-renders them
+RESPONSE_CACHE_TTL = config("RESPONSE_CACHE_TTL", default=30, cast=int)
+RESPONSE_CACHE_STALE_TTL = config("RESPONSE_CACHE_STALE_TTL", default=300, cast=int)
+RESPONSE_CACHE_LOCK_TTL = 10
+
+# home timeline: accounts with more followers are merged into feeds on read instead of fanned out on write
+TIMELINE_FANOUT_LIMIT = config("TIMELINE_FANOUT_LIMIT", default=10_000, cast=int)
+TIMELINE_BATCH_SIZE = 1000
+TIMELINE_BACKFILL = 50
+TIMELINE_WORKERS = config("TIMELINE_WORKERS", default=2, cast=int)  # fan-out threads per process, 0 runs it inline
+
+# trending hashtags: uses are rolled up into buckets by `manage.py rollup_trending`, run every bucket or more often
+TRENDING_BUCKET_MINUTES = 5
+TRENDING_RETENTION_HOURS = 24
+TRENDING_MAX_LIMIT = 50
+
+# users.otp
+OTP_MAX_ATTEMPTS = 5
+
+# users.authentication: users resolved for JWT requests, seconds in the shared cache / this process
+AUTH_USER_CACHE_TTL = config("AUTH_USER_CACHE_TTL", default=60, cast=int)
+AUTH_USER_CACHE_LOCAL_TTL = config("AUTH_USER_CACHE_LOCAL_TTL", default=5, cast=int)
+AUTH_USER_CACHE_LOCAL_SIZE = 10_000
+
+# users.blacklist: every worker keeps the revoked refresh-token JTIs in memory
+TOKEN_BLACKLIST_REBUILD_INTERVAL = config("TOKEN_BLACKLIST_REBUILD_INTERVAL", default=300, cast=int)
+TOKEN_BLACKLIST_CLOCK_SKEW = timedelta(seconds=5)
+# users.tokens: outstanding-token rows are bulk inserted by a background thread; 0 writes them inline
+TOKEN_OUTSTANDING_BATCH_SIZE = 200
+TOKEN_OUTSTANDING_FLUSH_INTERVAL = config("TOKEN_OUTSTANDING_FLUSH_INTERVAL", default=1.0, cast=float)
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -185,6 +242,21 @@ STATIC_URL = 'static/'
 
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+
+# uploads are stored once per distinct content under sharded hash paths; `manage.py relocate_media` moves older files
+STORAGES = {
+    "default": {"BACKEND": "shared.storage.ContentAddressedStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+# `manage.py collect_media` deletes unreferenced media files once they are older than this
+MEDIA_GC_GRACE_PERIOD = timedelta(hours=24)
+MEDIA_GC_MAX_DELETES_PER_SECOND = 100
+
+# Post.image derivatives, encoded on a process pool after upload (0 workers = only via generate_image_variants)
+IMAGE_PIPELINE_WORKERS = config("IMAGE_PIPELINE_WORKERS", default=2, cast=int)
+IMAGE_PIPELINE_MAX_PENDING = config("IMAGE_PIPELINE_MAX_PENDING", default=64, cast=int)
+IMAGE_VARIANT_WIDTHS = (320, 640, 1080)
+IMAGE_VARIANT_FORMATS = ('webp', 'jpeg')
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -193,6 +265,19 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = "users.User"
 
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+# shared.outbox: emails are queued in the database and sent by `manage.py send_outbox`
+EMAIL_OUTBOX_EAGER = config("EMAIL_OUTBOX_EAGER", default=DEBUG, cast=bool)  # send right after commit (dev/tests)
+EMAIL_OUTBOX_MAX_ATTEMPTS = 8
+EMAIL_OUTBOX_RETRY_DELAY = 30  # seconds, doubled on every failed attempt
+EMAIL_OUTBOX_MAX_RETRY_DELAY = 60 * 60
+
+# shared.sms: verification codes are queued and sent by background threads (0 workers = send inline)
+SMS_TRANSPORT = config("SMS_TRANSPORT", default="shared.sms.TwilioSmsTransport")
+SMS_FROM_NUMBER = config("SMS_FROM_NUMBER", default="+998907205768")
+SMS_DISPATCH_WORKERS = config("SMS_DISPATCH_WORKERS", default=2, cast=int)
+SMS_QUEUE_SIZE = 1000
+SMS_BATCH_SIZE = 20
+SMS_ENQUEUE_TIMEOUT = 0.05  # seconds; when the queue stays full the SMS is sent inline
 # EMAIL_USE_TLS = config("EMAIL_USE_TLS")
 # EMAIL_HOST = config("EMAIL_HOST")
 # EMAIL_HOST_USER = config("EMAIL_HOST_USER")
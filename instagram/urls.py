@@ -1,8 +1,11 @@
 from django.contrib import admin
 from django.urls import path, include
 
+from shared.views import SearchAPIView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('users/', include('users.urls')),
     path('posts/', include('post.urls')),
+    path('search/', SearchAPIView.as_view()),
 ]
@@ -1,18 +1,23 @@
 from django.contrib import admin
 
-from .models import PostLike, Post, PostComment, CommentLike
+from shared.search import TextSearchAdminMixin
+from .models import PostLike, Post, PostComment, CommentLike, Hashtag
 
 
 @admin.register(Post)
-class PostModelAdmin(admin.ModelAdmin):
+class PostModelAdmin(TextSearchAdminMixin, admin.ModelAdmin):
     list_display = 'id', 'author', 'caption', 'created_time'
     search_fields = "id", "author__username", 'caption'
+    search_type = 'posts'
+    exact_search_fields = "author__username",
 
 
 @admin.register(PostComment)
-class PostCommentModelAdmin(admin.ModelAdmin):
+class PostCommentModelAdmin(TextSearchAdminMixin, admin.ModelAdmin):
     list_display = "id", "author", "post", "created_time"
     search_fields = "id", "author__username", "comment"
+    search_type = 'comments'
+    exact_search_fields = "author__username",
 
 
 @admin.register(PostLike)
@@ -25,3 +30,9 @@ class PostLikeModelAdmin(admin.ModelAdmin):
 class CommentLikeModelAdmin(admin.ModelAdmin):
     list_display = "id", "author", "comment", "created_time"
     search_fields = "id", "author__username"
+
+
+@admin.register(Hashtag)
+class HashtagModelAdmin(admin.ModelAdmin):
+    list_display = "id", "name", "created_time"
+    search_fields = "=name",
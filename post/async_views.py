@@ -0,0 +1,51 @@
+from django.http import Http404
+from rest_framework.response import Response
+
+from post.models import Post, PostComment, CommentLike
+from post.serializers import PostSerializer, PostCommentSerializer
+from post.utility import CommentTree
+from shared.async_views import AsyncReadAPIView, gather_queries
+from shared.custom_pagination import CustomCursorPagination
+
+
+class AsyncPostListAPIView(AsyncReadAPIView):
+
+    async def get(self, request):
+        pagination = CustomCursorPagination()
+        page_queryset = pagination.get_page_queryset(Post.objects.feed(request.user), request)
+        posts = pagination.set_page([post async for post in page_queryset])
+        serializer = PostSerializer(posts, many=True, context={'request': request})
+        return pagination.get_paginated_response(serializer.data)
+
+
+class AsyncPostRetrieveAPIView(AsyncReadAPIView):
+
+    async def get(self, request, pk):
+        post = await Post.objects.feed(request.user).filter(pk=pk).afirst()
+        if post is None:
+            raise Http404("No Post matches the given query.")
+        return Response(PostSerializer(post, context={'request': request}).data)
+
+
+class AsyncPostCommentListAPIView(AsyncReadAPIView):
+
+    async def get(self, request, pk):
+        pagination = CustomCursorPagination()
+        page_queryset = pagination.get_page_queryset(
+            PostComment.objects.filter(post__id=pk, parent__isnull=True).select_related('author'), request
+        )
+        if request.user.is_authenticated:
+            liked_queryset = CommentLike.objects.filter(comment__post_id=pk, author=request.user)
+        else:
+            liked_queryset = CommentLike.objects.none()
+        # the page, the replies under it (the page query as a subquery) and the viewer's likes
+        # don't depend on each other
+        comments, tree, liked = await gather_queries(
+            page_queryset,
+            CommentTree.replies_in(page_queryset.values('pk')),
+            liked_queryset.values_list('comment_id', flat=True),
+        )
+        comments = pagination.set_page(comments)
+        context = {'request': request, 'comment_tree': CommentTree(tree, liked=liked)}
+        serializer = PostCommentSerializer(comments, many=True, context=context)
+        return pagination.get_paginated_response(serializer.data)
@@ -0,0 +1,100 @@
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+
+from post.models import Post
+from post.utility import invalidate_post_responses
+from shared.imaging import render_variants
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+
+_executor = None
+_slots = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor, _slots
+    with _executor_lock:
+        if _executor is None:
+            # spawn, not fork: web workers are multi-threaded and forking them can deadlock
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_PIPELINE_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+            _slots = threading.BoundedSemaphore(settings.IMAGE_PIPELINE_MAX_PENDING)
+        return _executor, _slots
+
+
+def schedule_variants(post: Post):
+    """Queue derivative generation once the surrounding transaction commits; never blocks on encoding."""
+    if not post.image or settings.IMAGE_PIPELINE_WORKERS <= 0:
+        return
+    transaction.on_commit(partial(submit_variants, post.pk, post.image.name))
+
+
+def submit_variants(post_id, image_name):
+    executor, slots = get_executor()
+    if not slots.acquire(blocking=False):
+        # the pool is saturated; generate_image_variants picks these up later
+        logger.warning("Image pipeline is full, skipping variants for post %s", post_id)
+        return
+    try:
+        with default_storage.open(image_name) as file:
+            data = file.read()
+        future = executor.submit(
+            render_variants, data, settings.IMAGE_VARIANT_WIDTHS, settings.IMAGE_VARIANT_FORMATS
+        )
+    except Exception:
+        slots.release()
+        logger.exception("Could not queue variants for post %s", post_id)
+        return
+    future.add_done_callback(partial(on_variants_done, post_id, image_name, slots))
+
+
+def on_variants_done(post_id, image_name, slots, future):
+    try:
+        store_variants(post_id, image_name, future.result())
+    except Exception:
+        logger.exception("Could not generate variants for post %s", post_id)
+    finally:
+        slots.release()
+        connections.close_all()
+
+
+def generate_variants(post: Post):
+    """Synchronous variant generation for management commands."""
+    with post.image.open('rb') as file:
+        data = file.read()
+    variants = render_variants(data, settings.IMAGE_VARIANT_WIDTHS, settings.IMAGE_VARIANT_FORMATS)
+    return store_variants(post.pk, post.image.name, variants)
+
+
+def variant_names(image_variants):
+    return {name for widths in (image_variants or {}).values() for name in widths.values()}
+
+
+def store_variants(post_id, image_name, variants):
+    previous = Post.objects.filter(pk=post_id).values_list('image_variants', flat=True).first()
+    image_variants = {}
+    for (width, fmt), content in variants.items():
+        name = default_storage.save(f"posts/variants/{post_id}/{width}w.{EXTENSIONS[fmt]}", ContentFile(content))
+        image_variants.setdefault(fmt, {})[str(width)] = name
+    # the image may have been replaced while we were encoding; then these variants are stale
+    updated = Post.objects.filter(pk=post_id, image=image_name).update(image_variants=image_variants)
+    # every save above took a storage reference; give back the ones no longer used
+    released = variant_names(previous) if updated else variant_names(image_variants)
+    for name in released:
+        default_storage.delete(name)
+    if updated:
+        invalidate_post_responses([post_id])
+    return bool(updated)
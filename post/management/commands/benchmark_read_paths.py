@@ -0,0 +1,107 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.asgi import get_asgi_application
+from django.core.wsgi import get_wsgi_application
+
+from post.models import Post
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = ("Compare latency and throughput of the sync post read views behind the WSGI handler with the "
+            "async ones behind the ASGI handler, in process and under the same concurrency")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help="Requests per endpoint and path")
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument('--user', help="Username to send a bearer token for, anonymous by default")
+        parser.add_argument('--host', default=None, help="Host header, the first ALLOWED_HOSTS entry by default")
+
+    def handle(self, *args, **options):
+        post = Post.objects.order_by('-comment_count', '-created_time').first()
+        if post is None:
+            raise CommandError("No posts to read")
+        hosts = [host for host in settings.ALLOWED_HOSTS if host not in ('*', '')]
+        self.headers = {'Host': options['host'] or (hosts[0].lstrip('.') if hosts else 'localhost')}
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+            if user is None:
+                raise CommandError(f"User {options['user']} not found")
+            self.headers['Authorization'] = f"Bearer {user.token()['access']}"
+
+        endpoints = [
+            ('list', '/posts/list-create/', '/posts/async/list/'),
+            ('detail', f'/posts/{post.pk}/', f'/posts/async/{post.pk}/'),
+            ('comments', f'/posts/{post.pk}/comments/', f'/posts/async/{post.pk}/comments/'),
+        ]
+        self.stdout.write(f"{options['requests']} requests per row, concurrency {options['concurrency']}")
+        for name, sync_url, async_url in endpoints:
+            self.report(name, 'wsgi', self.run_wsgi(sync_url, options['requests'], options['concurrency']))
+            self.report(name, 'asgi', asyncio.run(self.run_asgi(async_url, options['requests'], options['concurrency'])))
+
+    def run_wsgi(self, url, requests, concurrency):
+        application = get_wsgi_application()
+        environ = {'HTTP_' + name.upper().replace('-', '_'): value for name, value in self.headers.items()}
+        setup_testing_defaults(environ)
+        environ.update(REQUEST_METHOD='GET', PATH_INFO=url, QUERY_STRING='')
+
+        def fetch(_):
+            status = []
+            started = time.perf_counter()
+            body = application(dict(environ), lambda code, headers, exc_info=None: status.append(code))
+            b''.join(body)
+            body.close()
+            return time.perf_counter() - started, int(status[0].split()[0])
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(fetch, range(requests)))
+        return results, time.perf_counter() - started
+
+    async def run_asgi(self, url, requests, concurrency):
+        application = get_asgi_application()
+        semaphore = asyncio.Semaphore(concurrency)
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+            'path': url, 'raw_path': url.encode(), 'query_string': b'', 'client': ('127.0.0.1', 0),
+            'server': (self.headers['Host'], 80),
+            'headers': [(name.lower().encode(), value.encode()) for name, value in self.headers.items()],
+        }
+
+        async def fetch():
+            messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+            status = []
+
+            async def receive():
+                if messages:
+                    return messages.pop()
+                return await asyncio.Future()  # the client never disconnects
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    status.append(message['status'])
+
+            async with semaphore:
+                started = time.perf_counter()
+                await application(dict(scope), receive, send)
+                return time.perf_counter() - started, status[0]
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(fetch() for _ in range(requests)))
+        return results, time.perf_counter() - started
+
+    def report(self, name, path, run):
+        results, elapsed = run
+        latency = sorted(seconds * 1000 for seconds, _ in results)
+        errors = sum(1 for _, status in results if status != 200)
+        self.stdout.write(
+            f"{name:>8} {path}: p50 {statistics.median(latency):7.1f}ms "
+            f"p99 {latency[min(len(latency) - 1, int(len(latency) * 0.99))]:7.1f}ms "
+            f"{len(results) / elapsed:7.0f} req/s" + (f", {errors} non-200" if errors else "")
+        )
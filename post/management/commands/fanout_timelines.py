@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from post.models import Post
+from post.timeline import fanout
+
+
+class Command(BaseCommand):
+    help = "Fan out posts whose fan-out job was lost (the process stopped with jobs still queued)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--grace', type=int, default=60,
+                            help="Seconds a new post is left to the in-process workers before it is picked up here")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(seconds=options['grace'])
+        pending = Post.objects.filter(fanned_out=False, created_time__lte=cutoff).order_by('created_time')
+        total = 0
+        while True:
+            posts = list(pending[:options['batch_size']])
+            if not posts:
+                break
+            for post in posts:
+                fanout(post)
+            total += len(posts)
+        self.stdout.write(f"{total} posts fanned out")
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from post.image_pipeline import generate_variants
+from post.models import Post
+
+
+class Command(BaseCommand):
+    help = "Generate thumbnail/WebP/JPEG variants for posts that don't have them yet"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Regenerate variants for every post")
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        queryset = Post.objects.exclude(image='').order_by('pk')
+        if not options['all']:
+            queryset = queryset.filter(image_variants={})
+
+        done = failed = 0
+        for post in queryset.only('pk', 'image').iterator(chunk_size=options['batch_size']):
+            try:
+                generate_variants(post)
+                done += 1
+            except (OSError, ValueError) as e:
+                failed += 1
+                self.stderr.write(f"{post.pk}: {e}")
+        self.stdout.write(f"{done} posts processed, {failed} failed")
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from post.models import Post, PostComment
+from post.tags import index_tags
+
+
+class Command(BaseCommand):
+    help = "Parse hashtags and mentions out of every caption and comment, e.g. for rows written before indexing existed"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        posts = self.index(Post.objects.only('caption', 'created_time'), options['batch_size'],
+                           lambda post: index_tags(post.caption, post.pk, post_created_time=post.created_time))
+        comments = self.index(PostComment.objects.only('comment', 'post_id'), options['batch_size'],
+                              lambda comment: index_tags(comment.comment, comment.post_id, comment=comment))
+        self.stdout.write(f"{posts} captions and {comments} comments indexed")
+
+    @staticmethod
+    def index(queryset, batch_size, index):
+        indexed = 0
+        last_pk = None
+        while True:
+            batch = queryset.order_by('pk')
+            if last_pk is not None:
+                batch = batch.filter(pk__gt=last_pk)
+            rows = list(batch[:batch_size])
+            if not rows:
+                return indexed
+            for row in rows:
+                index(row)
+            indexed += len(rows)
+            last_pk = rows[-1].pk
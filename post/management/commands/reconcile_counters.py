@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import OuterRef
+
+from post.models import Post, PostComment, PostLike, CommentLike, count_subquery
+
+COUNTERS = {
+    Post: {
+        'like_count': (PostLike, 'post'),
+        'comment_count': (PostComment, 'post'),
+    },
+    PostComment: {
+        'like_count': (CommentLike, 'comment'),
+        'reply_count': (PostComment, 'parent'),
+    },
+}
+
+
+class Command(BaseCommand):
+    help = "Recompute denormalized like/comment/reply counters from the source tables in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        for model, counters in COUNTERS.items():
+            fixed = self.reconcile(model, counters, options['batch_size'])
+            self.stdout.write(f"{model._meta.label}: {fixed} rows fixed")
+
+    @staticmethod
+    def reconcile(model, counters, batch_size):
+        actual = {
+            field: count_subquery(source.objects.filter(**{fk: OuterRef('pk')}), fk)
+            for field, (source, fk) in counters.items()
+        }
+        fixed = 0
+        last_pk = None
+        while True:
+            queryset = model.objects.order_by('pk')
+            if last_pk is not None:
+                queryset = queryset.filter(pk__gt=last_pk)
+            rows = list(
+                queryset.annotate(**{f"actual_{field}": value for field, value in actual.items()})
+                .values('pk', *counters, *[f"actual_{field}" for field in counters])[:batch_size]
+            )
+            if not rows:
+                return fixed
+            last_pk = rows[-1]['pk']
+            stale = [
+                row['pk'] for row in rows
+                if any(row[field] != row[f"actual_{field}"] for field in counters)
+            ]
+            if stale:
+                # recount inside the UPDATE so concurrent F() increments are not overwritten
+                with transaction.atomic():
+                    fixed += model.objects.filter(pk__in=stale).update(**actual)
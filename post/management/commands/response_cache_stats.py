@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from post.views import PostListCreateAPIView, PostRetrieveUpdateDestroyAPIView, PostCommentListCreateAPIView
+from shared.response_cache import response_cache_stats
+
+
+class Command(BaseCommand):
+    help = "Print hit/stale/miss counters and hit ratio of the anonymous post response cache"
+
+    def handle(self, *args, **options):
+        views = (PostListCreateAPIView, PostRetrieveUpdateDestroyAPIView, PostCommentListCreateAPIView)
+        for scope, stats in response_cache_stats([view.response_cache_scope for view in views]).items():
+            self.stdout.write(
+                f"{scope}: hit {stats['hit']}, stale {stats['stale']}, miss {stats['miss']}, "
+                f"hit ratio {stats['hit_ratio']:.1%}"
+            )
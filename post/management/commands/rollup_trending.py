@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from post.trending import rollup
+
+
+class Command(BaseCommand):
+    help = ("Recount the latest trending buckets from hashtag uses and drop the expired ones; "
+            "run at least once every TRENDING_BUCKET_MINUTES")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--buckets', type=int, default=2,
+                            help="How many of the latest buckets to recount, the open one included")
+
+    def handle(self, *args, **options):
+        written, expired = rollup(options['buckets'])
+        self.stdout.write(f"{written} bucket rows written, {expired} expired rows deleted")
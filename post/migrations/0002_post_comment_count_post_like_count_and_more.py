@@ -0,0 +1,57 @@
+# Generated by Django 5.1.1 on 2026-10-18 18:11
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(model, fk):
+    queryset = model.objects.filter(**{fk: OuterRef('pk')}).order_by().values(fk).annotate(
+        total=Count('*')).values('total')
+    return Coalesce(Subquery(queryset, output_field=IntegerField()), 0)
+
+
+def backfill_counters(apps, schema_editor):
+    Post = apps.get_model('post', 'Post')
+    PostComment = apps.get_model('post', 'PostComment')
+    PostLike = apps.get_model('post', 'PostLike')
+    CommentLike = apps.get_model('post', 'CommentLike')
+    Post.objects.update(
+        like_count=count_subquery(PostLike, 'post'),
+        comment_count=count_subquery(PostComment, 'post'),
+    )
+    PostComment.objects.update(
+        like_count=count_subquery(CommentLike, 'comment'),
+        reply_count=count_subquery(PostComment, 'parent'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='postcomment',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='postcomment',
+            name='reply_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
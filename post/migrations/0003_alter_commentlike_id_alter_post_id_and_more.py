@@ -0,0 +1,88 @@
+# Generated by Django 5.1.1 on 2026-10-18 18:13
+"""
+On PostgreSQL posts, post_postcomment, post_postlike and post_commentlike, together with
+the post_id/comment_id/parent_id columns that reference them, are converted online by
+``convert_uuid_keys`` as in users 0006; the AlterFields only update the migration state there.
+"""
+
+import uuid
+
+import shared.models
+from django.db import migrations, models
+
+from shared.migration_operations import AlterFieldExceptPostgres, convert_uuid_keys
+
+BATCH_SIZE = 5000
+
+
+def uuid_columns(apps):
+    for model in apps.get_models(include_auto_created=True):
+        if not model._meta.managed or model._meta.proxy:
+            continue
+        for field in model._meta.local_concrete_fields:
+            target = field.target_field if field.is_relation else field
+            if isinstance(target, models.UUIDField):
+                yield model, field
+
+
+def convert_uuid_columns(apps, schema_editor):
+    """
+    PostgreSQL has native uuid columns, converted by ``convert_uuid_keys``. Other backends
+    store UUIDField as 32-char hex, so the old hyphenated values are rewritten here in batches.
+    """
+    if schema_editor.connection.vendor == 'postgresql':
+        return
+    for model, field in uuid_columns(apps):
+        table = schema_editor.quote_name(model._meta.db_table)
+        column = schema_editor.quote_name(field.column)
+        pk = schema_editor.quote_name(model._meta.pk.column)
+        with schema_editor.connection.cursor() as cursor:
+            while True:
+                cursor.execute(
+                    f"SELECT {pk}, {column} FROM {table} WHERE {column} LIKE %s LIMIT {BATCH_SIZE}",
+                    ['%-%']
+                )
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                cursor.executemany(
+                    f"UPDATE {table} SET {column} = %s WHERE {pk} = %s",
+                    [(uuid.UUID(value).hex, row_pk) for row_pk, value in rows]
+                )
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('post', '0002_post_comment_count_post_like_count_and_more'),
+        ('users', '0006_alter_user_id_alter_userconfirmation_id'),
+    ]
+
+    operations = [
+        AlterFieldExceptPostgres(
+            model_name='commentlike',
+            name='id',
+            field=models.UUIDField(default=shared.models.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+        AlterFieldExceptPostgres(
+            model_name='post',
+            name='id',
+            field=models.UUIDField(default=shared.models.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+        AlterFieldExceptPostgres(
+            model_name='postcomment',
+            name='id',
+            field=models.UUIDField(default=shared.models.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+        AlterFieldExceptPostgres(
+            model_name='postlike',
+            name='id',
+            field=models.UUIDField(default=shared.models.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.RunPython(
+            convert_uuid_keys('posts', 'post_postcomment', 'post_postlike', 'post_commentlike'),
+            migrations.RunPython.noop
+        ),
+        migrations.RunPython(convert_uuid_columns, migrations.RunPython.noop),
+    ]
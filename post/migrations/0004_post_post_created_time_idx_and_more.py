@@ -0,0 +1,23 @@
+# Generated by Django 5.1.1 on 2026-10-18 18:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post', '0003_alter_commentlike_id_alter_post_id_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-created_time', '-id'], name='post_created_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='postcomment',
+            index=models.Index(fields=['post', '-created_time', '-id'], name='comment_post_time_idx'),
+        ),
+    ]
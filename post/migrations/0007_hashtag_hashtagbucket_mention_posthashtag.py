@@ -0,0 +1,78 @@
+# Generated by Django 5.1.1 on 2026-10-18 18:58
+
+import django.db.models.deletion
+import shared.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post', '0006_timelineentry_post_post_author_time_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Hashtag',
+            fields=[
+                ('id', models.UUIDField(default=shared.models.uuid7, editable=False, primary_key=True, serialize=False)),
+                ('created_time', models.DateTimeField(auto_now_add=True)),
+                ('updated_time', models.DateTimeField(auto_now=True)),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+            options={
+                'db_table': 'hashtags',
+            },
+        ),
+        migrations.CreateModel(
+            name='HashtagBucket',
+            fields=[
+                ('id', models.UUIDField(default=shared.models.uuid7, editable=False, primary_key=True, serialize=False)),
+                ('created_time', models.DateTimeField(auto_now_add=True)),
+                ('updated_time', models.DateTimeField(auto_now=True)),
+                ('start', models.DateTimeField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('hashtag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='buckets', to='post.hashtag')),
+            ],
+            options={
+                'db_table': 'hashtag_buckets',
+                'indexes': [models.Index(fields=['start'], name='hashtag_bucket_start_idx')],
+                'constraints': [models.UniqueConstraint(fields=('hashtag', 'start'), name='unique_hashtag_bucket')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Mention',
+            fields=[
+                ('id', models.UUIDField(default=shared.models.uuid7, editable=False, primary_key=True, serialize=False)),
+                ('created_time', models.DateTimeField(auto_now_add=True)),
+                ('updated_time', models.DateTimeField(auto_now=True)),
+                ('comment', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='mentions', to='post.postcomment')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mentions', to='post.post')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mentions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'mentions',
+                'indexes': [models.Index(fields=['user', '-created_time', '-id'], name='mention_user_time_idx'), models.Index(fields=['post', 'comment'], name='mention_source_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('comment__isnull', True)), fields=('user', 'post'), name='unique_caption_mention'), models.UniqueConstraint(condition=models.Q(('comment__isnull', False)), fields=('user', 'comment'), name='unique_comment_mention')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PostHashtag',
+            fields=[
+                ('id', models.UUIDField(default=shared.models.uuid7, editable=False, primary_key=True, serialize=False)),
+                ('created_time', models.DateTimeField(auto_now_add=True)),
+                ('updated_time', models.DateTimeField(auto_now=True)),
+                ('post_created_time', models.DateTimeField()),
+                ('comment', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='hashtags', to='post.postcomment')),
+                ('hashtag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='uses', to='post.hashtag')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hashtags', to='post.post')),
+            ],
+            options={
+                'db_table': 'post_hashtags',
+                'indexes': [models.Index(condition=models.Q(('comment__isnull', True)), fields=['hashtag', '-post_created_time', '-post'], name='hashtag_feed_idx'), models.Index(fields=['post', 'comment'], name='post_hashtag_source_idx'), models.Index(fields=['created_time'], name='post_hashtag_time_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('comment__isnull', True)), fields=('hashtag', 'post'), name='unique_caption_hashtag'), models.UniqueConstraint(condition=models.Q(('comment__isnull', False)), fields=('hashtag', 'comment'), name='unique_comment_hashtag')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.1 on 2026-10-18 19:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+
+
+def backfill_roots(apps, schema_editor):
+    """One UPDATE per reply depth: first the direct replies, then each level below the last."""
+    PostComment = apps.get_model('post', 'PostComment')
+    PostComment.objects.filter(parent__isnull=False, parent__parent__isnull=True).update(root=F('parent'))
+    parent_root = PostComment.objects.filter(pk=OuterRef('parent_id')).values('root_id')[:1]
+    while PostComment.objects.filter(root__isnull=True, parent__root__isnull=False).update(root=Subquery(parent_root)):
+        pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post', '0007_hashtag_hashtagbucket_mention_posthashtag'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='postcomment',
+            name='root',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='thread', to='post.postcomment'),
+        ),
+        migrations.AddIndex(
+            model_name='postcomment',
+            index=models.Index(fields=['root', 'created_time', 'id'], name='comment_root_time_idx'),
+        ),
+        migrations.RunPython(backfill_roots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.1 on 2026-10-18 20:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post', '0008_postcomment_root'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # existing posts were fanned out on the request thread already
+        migrations.AddField(
+            model_name='post',
+            name='fanned_out',
+            field=models.BooleanField(default=True, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='fanned_out',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('fanned_out', False)), fields=['created_time'], name='post_fanout_pending_idx'),
+        ),
+    ]
@@ -1,27 +1,79 @@
 from django.contrib.auth import get_user_model
 from django.core.validators import FileExtensionValidator, MaxLengthValidator
-from django.db import models
-from django.db.models import UniqueConstraint
+from django.db import models, transaction
+from django.db.models import UniqueConstraint, Q, Count, Exists, OuterRef, Subquery, Value, IntegerField
+from django.db.models.functions import Coalesce
 
 from shared.models import BaseModel
 
 User = get_user_model()
 
 
+def count_subquery(queryset, field):
+    queryset = queryset.order_by().values(field).annotate(total=Count('*')).values('total')
+    return Coalesce(Subquery(queryset, output_field=IntegerField()), 0)
+
+
+def me_liked(user, post_field='pk'):
+    if user is not None and user.is_authenticated:
+        return Exists(PostLike.objects.filter(post=OuterRef(post_field), author=user))
+    return Value(False)
+
+
+class PostQuerySet(models.QuerySet):
+    def feed(self, user=None):
+        return self.select_related('author').annotate(me_liked=me_liked(user))
+
+
+class PostEntryQuerySet(models.QuerySet):
+    """Rows that point at a post (timeline entries, hashtag uses) and are paged as posts."""
+
+    def feed(self, user=None):
+        return self.select_related('post__author').annotate(me_liked=me_liked(user, 'post_id'))
+
+    def posts(self):
+        posts = []
+        for entry in self:
+            entry.post.me_liked = entry.me_liked
+            posts.append(entry.post)
+        return posts
+
+
 class Post(BaseModel):
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='posts')
     image = models.ImageField(upload_to='posts/',
                               validators=[FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png'])])
     caption = models.TextField(validators=[MaxLengthValidator(2000)])
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+    like_count = models.PositiveIntegerField(default=0, editable=False)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    # set once the post is in its followers' timelines, see post.timeline.schedule_fanout
+    fanned_out = models.BooleanField(default=False, editable=False)
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         db_table = 'posts'
         verbose_name = "post"
         verbose_name_plural = "posts"
+        indexes = [
+            models.Index(fields=['-created_time', '-id'], name='post_created_time_idx'),
+            models.Index(fields=['author', '-created_time', '-id'], name='post_author_time_idx'),
+            models.Index(fields=['created_time'], name='post_fanout_pending_idx', condition=Q(fanned_out=False)),
+        ]
 
     def __str__(self):
         return f"{self.author} post about {self.caption}"
 
+    def save(self, *args, **kwargs):
+        from post.tags import index_tags
+
+        created, reindex = self._state.adding, 'caption' in self.get_dirty_fields()
+        with transaction.atomic():
+            super(Post, self).save(*args, **kwargs)
+            if reindex:
+                index_tags(self.caption, self.pk, post_created_time=self.created_time, created=created)
+
 
 class PostComment(BaseModel):
     author = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -34,10 +86,38 @@ class PostComment(BaseModel):
         null=True,
         blank=True
     )
+    # top-level comment of the thread, so a thread loads in one query without walking parents
+    root = models.ForeignKey(
+        'self',
+        on_delete=models.CASCADE,
+        related_name='thread',
+        null=True,
+        blank=True,
+        editable=False
+    )
+    like_count = models.PositiveIntegerField(default=0, editable=False)
+    reply_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['post', '-created_time', '-id'], name='comment_post_time_idx'),
+            models.Index(fields=['root', 'created_time', 'id'], name='comment_root_time_idx'),
+        ]
 
     def __str__(self):
         return f"Comment by {self.author}"
 
+    def save(self, *args, **kwargs):
+        from post.tags import index_tags
+
+        created, reindex = self._state.adding, 'comment' in self.get_dirty_fields()
+        if created and self.parent_id is not None:
+            self.root_id = self.parent.root_id or self.parent_id
+        with transaction.atomic():
+            super(PostComment, self).save(*args, **kwargs)
+            if reindex:
+                index_tags(self.comment, self.post_id, comment=self, created=created)
+
 
 class PostLike(BaseModel):
     author = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -64,3 +144,102 @@ class CommentLike(BaseModel):
             )
 
         ]
+
+
+class TimelineEntry(BaseModel):
+    """
+    One post in one user's home timeline, written by fan-out when the post is
+    created. ``post_created_time`` copies the post's time so a page of the
+    timeline is a single range scan of (user, post_created_time, post).
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='timeline')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='timeline_entries')
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    post_created_time = models.DateTimeField()
+
+    objects = PostEntryQuerySet.as_manager()
+
+    class Meta:
+        db_table = 'timeline_entries'
+        constraints = [
+            UniqueConstraint(fields=('user', 'post'), name='unique_timeline_user_post'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-post_created_time', '-post'], name='timeline_user_time_idx'),
+            models.Index(fields=['user', 'author'], name='timeline_user_author_idx'),
+        ]
+
+
+class Hashtag(BaseModel):
+    name = models.CharField(max_length=100, unique=True)
+
+    class Meta:
+        db_table = 'hashtags'
+
+    def __str__(self):
+        return f"#{self.name}"
+
+
+class PostHashtag(BaseModel):
+    """
+    A hashtag used in a post's caption (``comment`` is null) or in one of its
+    comments. Caption uses are the hashtag feed, read newest first from
+    (hashtag, post_created_time, post); every use counts towards trending.
+    """
+    hashtag = models.ForeignKey(Hashtag, on_delete=models.CASCADE, related_name='uses')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='hashtags')
+    comment = models.ForeignKey(PostComment, on_delete=models.CASCADE, related_name='hashtags', null=True)
+    post_created_time = models.DateTimeField()
+
+    objects = PostEntryQuerySet.as_manager()
+
+    class Meta:
+        db_table = 'post_hashtags'
+        constraints = [
+            UniqueConstraint(fields=('hashtag', 'post'), condition=Q(comment__isnull=True),
+                             name='unique_caption_hashtag'),
+            UniqueConstraint(fields=('hashtag', 'comment'), condition=Q(comment__isnull=False),
+                             name='unique_comment_hashtag'),
+        ]
+        indexes = [
+            models.Index(fields=['hashtag', '-post_created_time', '-post'], condition=Q(comment__isnull=True),
+                         name='hashtag_feed_idx'),
+            models.Index(fields=['post', 'comment'], name='post_hashtag_source_idx'),
+            models.Index(fields=['created_time'], name='post_hashtag_time_idx'),
+        ]
+
+
+class Mention(BaseModel):
+    """A user @mentioned in a post's caption (``comment`` is null) or in one of its comments."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='mentions')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='mentions')
+    comment = models.ForeignKey(PostComment, on_delete=models.CASCADE, related_name='mentions', null=True)
+
+    class Meta:
+        db_table = 'mentions'
+        constraints = [
+            UniqueConstraint(fields=('user', 'post'), condition=Q(comment__isnull=True),
+                             name='unique_caption_mention'),
+            UniqueConstraint(fields=('user', 'comment'), condition=Q(comment__isnull=False),
+                             name='unique_comment_mention'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-created_time', '-id'], name='mention_user_time_idx'),
+            models.Index(fields=['post', 'comment'], name='mention_source_idx'),
+        ]
+
+
+class HashtagBucket(BaseModel):
+    """Uses of a hashtag that started in one TRENDING_BUCKET_MINUTES window, written by rollup_trending."""
+    hashtag = models.ForeignKey(Hashtag, on_delete=models.CASCADE, related_name='buckets')
+    start = models.DateTimeField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'hashtag_buckets'
+        constraints = [
+            UniqueConstraint(fields=('hashtag', 'start'), name='unique_hashtag_bucket'),
+        ]
+        indexes = [
+            models.Index(fields=['start'], name='hashtag_bucket_start_idx'),
+        ]
@@ -1,6 +1,8 @@
+from django.core.files.storage import default_storage
 from rest_framework import serializers
 
 from post.models import Post, PostLike, PostComment, CommentLike
+from post.utility import CommentTree
 from users.models import User
 
 
@@ -18,34 +20,58 @@ class PostSerializer(serializers.ModelSerializer):
     post_like_count = serializers.SerializerMethodField("get_post_like_count")
     comment_like_count = serializers.SerializerMethodField("get_comment_like_count")
     me_liked = serializers.SerializerMethodField("get_me_liked")
+    image_srcset = serializers.SerializerMethodField("get_image_srcset")
 
     class Meta:
         model = Post
         fields = (
-            "id", "author", "caption", "created_time", "post_like_count", "comment_like_count", "me_liked"
+            "id", "author", "image", "image_srcset", "caption", "created_time", "post_like_count",
+            "comment_like_count", "me_liked"
         )
 
         extra_kwargs = {"image": {"required": False}}
 
     @staticmethod
     def get_post_like_count(obj: Post):
-        return obj.likes.count()
+        return obj.like_count
 
     @staticmethod
     def get_comment_like_count(obj: Post):
-        return obj.comments.count()
+        return obj.comment_count
+
+    def get_image_srcset(self, obj: Post):
+        request = self.context.get("request", None)
+        srcset = {}
+        for fmt, variants in obj.image_variants.items():
+            candidates = []
+            for width, name in sorted(variants.items(), key=lambda item: int(item[0])):
+                url = default_storage.url(name)
+                if request is not None:
+                    url = request.build_absolute_uri(url)
+                candidates.append(f"{url} {width}w")
+            srcset[fmt] = ", ".join(candidates)
+        return srcset
 
     def get_me_liked(self, obj: Post):
+        if hasattr(obj, 'me_liked'):
+            return obj.me_liked
         request = self.context.get("request", None)
         if request is not None and request.user.is_authenticated:
-            try:
-                PostLike.objects.get(post=obj, author=request.user)
-                return True
-            except PostLike.DoesNotExist:
-                return False
+            return PostLike.objects.filter(post=obj, author=request.user).exists()
         return False
 
 
+class PostCommentListSerializer(serializers.ListSerializer):
+
+    def to_representation(self, data):
+        comments = list(data.all() if hasattr(data, 'all') else data)
+        if 'comment_tree' not in self.context:
+            request = self.context.get("request")
+            user = request.user if request is not None else None
+            self.context['comment_tree'] = CommentTree.for_comments(comments, user)
+        return super(PostCommentListSerializer, self).to_representation(comments)
+
+
 class PostCommentSerializer(serializers.ModelSerializer):
     id = serializers.UUIDField(read_only=True)
     author = UserSerializer(read_only=True)
@@ -55,6 +81,7 @@ class PostCommentSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = PostComment
+        list_serializer_class = PostCommentListSerializer
         fields = (
             "id",
             "author",
@@ -67,23 +94,37 @@ class PostCommentSerializer(serializers.ModelSerializer):
             "post",
         )
 
+    def get_comment_tree(self, obj: PostComment) -> CommentTree:
+        if 'comment_tree' not in self.context:
+            request = self.context.get("request")
+            user = request.user if request is not None else None
+            self.context['comment_tree'] = CommentTree.for_comments([obj], user)
+        return self.context['comment_tree']
+
     def get_replies(self, obj: PostComment):
-        if obj.child.exists():
-            serializer = self.__class__(obj.child.all(), many=True, context=self.context)
+        replies = self.get_comment_tree(obj).get_replies(obj)
+        if replies:
+            serializer = self.__class__(replies, many=True, context=self.context)
             return serializer.data
         else:
             return None
 
     def get_me_liked(self, obj: PostComment):
-        user = self.context.get("request").user
-        if user.is_authenticated:
-            return obj.likes.filter(author=user).exists()
-        else:
-            return False
+        return self.get_comment_tree(obj).is_liked(obj)
 
     @staticmethod
     def get_likes_count(obj: PostComment):
-        return obj.likes.count()
+        return obj.like_count
+
+
+class CommentSearchSerializer(serializers.ModelSerializer):
+    id = serializers.UUIDField(read_only=True)
+    author = UserSerializer(read_only=True)
+    likes_count = serializers.IntegerField(source='like_count', read_only=True)
+
+    class Meta:
+        model = PostComment
+        fields = ("id", "author", "comment", "created_time", "parent", "post", "likes_count")
 
 
 class CommentLikeSerializer(serializers.ModelSerializer):
@@ -108,3 +149,13 @@ class PostLikeSerializer(serializers.ModelSerializer):
             "id", "author", "post"
         )
         extra_kwargs = {"post": {"required": False}}
+
+
+class LikeActionSerializer(serializers.Serializer):
+    type = serializers.ChoiceField(choices=("post", "comment"))
+    id = serializers.UUIDField()
+    action = serializers.ChoiceField(choices=("like", "unlike"))
+
+
+class BulkLikeSerializer(serializers.Serializer):
+    actions = LikeActionSerializer(many=True, allow_empty=False, max_length=500)
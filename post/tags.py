@@ -0,0 +1,74 @@
+import re
+
+from django.db.models.functions import Upper
+
+from post.models import Post, Hashtag, PostHashtag, Mention
+from users.models import User
+
+HASHTAG_RE = re.compile(r'(?<![\w&#])#(\w+)')
+MENTION_RE = re.compile(r'(?<![\w@])@([\w.-]+)')
+MAX_HASHTAGS = 30
+MAX_MENTIONS = 20
+
+
+def normalize_hashtag(name):
+    return name.casefold()
+
+
+def extract_hashtags(text):
+    """Distinct normalized hashtags in order of first use, at most MAX_HASHTAGS."""
+    names = {}
+    for match in HASHTAG_RE.finditer(text or ''):
+        name = normalize_hashtag(match.group(1))
+        if len(name) <= Hashtag._meta.get_field('name').max_length:
+            names.setdefault(name, None)
+    return list(names)[:MAX_HASHTAGS]
+
+
+def extract_mentions(text):
+    usernames = {}
+    for match in MENTION_RE.finditer(text or ''):
+        username = match.group(1).rstrip('.')
+        if username:
+            usernames.setdefault(username.upper(), None)
+    return list(usernames)[:MAX_MENTIONS]
+
+
+def index_tags(text, post_id, comment=None, post_created_time=None, created=False):
+    """
+    Bring the hashtag and mention rows of one caption (or comment) in line with
+    its text: rows for tags that are gone are deleted and new ones inserted, so
+    unchanged tags keep their rows and are not counted again for trending.
+    ``created`` skips looking up the rows of a source that was just inserted.
+    """
+    source = {'post_id': post_id, 'comment': comment}
+
+    hashtag_ids = set()
+    names = extract_hashtags(text)
+    if names:
+        Hashtag.objects.bulk_create([Hashtag(name=name) for name in names], ignore_conflicts=True)
+        hashtag_ids = set(Hashtag.objects.filter(name__in=names).values_list('pk', flat=True))
+    current = set() if created else set(PostHashtag.objects.filter(**source).values_list('hashtag_id', flat=True))
+    if current - hashtag_ids:
+        PostHashtag.objects.filter(hashtag_id__in=current - hashtag_ids, **source).delete()
+    if hashtag_ids - current:
+        if post_created_time is None:
+            post_created_time = Post.objects.filter(pk=post_id).values_list('created_time', flat=True).get()
+        PostHashtag.objects.bulk_create(
+            [PostHashtag(hashtag_id=pk, post_created_time=post_created_time, **source) for pk in hashtag_ids - current],
+            ignore_conflicts=True,
+        )
+
+    user_ids = set()
+    usernames = extract_mentions(text)
+    if usernames:
+        # matches the case-insensitive username index
+        user_ids = set(
+            User.objects.annotate(username_upper=Upper('username'))
+            .filter(username_upper__in=usernames).values_list('pk', flat=True)
+        )
+    current = set() if created else set(Mention.objects.filter(**source).values_list('user_id', flat=True))
+    if current - user_ids:
+        Mention.objects.filter(user_id__in=current - user_ids, **source).delete()
+    if user_ids - current:
+        Mention.objects.bulk_create([Mention(user_id=pk, **source) for pk in user_ids - current], ignore_conflicts=True)
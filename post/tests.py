@@ -1,3 +1,163 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from post.models import Post, PostComment, PostLike, TimelineEntry, PostHashtag, Mention
+from post.timeline import schedule_fanout
+from users import authentication
+from users.models import User
+
+
+class AsyncAuthenticationTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        authentication._local_users.clear()
+        self.user = User.objects.create(username='tester', email='tester@example.com')
+        self.post = Post.objects.create(author=self.user, image='posts/a.jpg', caption='caption')
+        PostLike.objects.create(author=self.user, post=self.post)
+
+    def test_jwt(self):
+        response = self.client.get(
+            f'/posts/async/{self.post.pk}/', HTTP_AUTHORIZATION=f"Bearer {self.user.token()['access']}"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['me_liked'])
+
+    def test_token_authentication(self):
+        token = Token.objects.create(user=self.user)
+        response = self.client.get(f'/posts/async/{self.post.pk}/', HTTP_AUTHORIZATION=f"Token {token.key}")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['me_liked'])
+
+    def test_invalid_token(self):
+        response = self.client.get(f'/posts/async/{self.post.pk}/', HTTP_AUTHORIZATION="Token invalid")
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('Bearer', response['WWW-Authenticate'])
+
+
+@override_settings(TIMELINE_WORKERS=0, TIMELINE_FANOUT_LIMIT=1)
+class TimelineTest(TestCase):
+    """Fan-out jobs run inline on commit; accounts with more than one follower count as celebrities."""
+
+    def setUp(self):
+        cache.clear()
+        authentication._local_users.clear()
+        self.viewer, self.author, self.celebrity, self.other = (
+            User.objects.create(username=name, email=f'{name}@example.com')
+            for name in ('viewer', 'author', 'celebrity', 'other')
+        )
+        # signed here: the outstanding-token rows are on_commit work that must not run below
+        self.clients = {}
+        for user in (self.viewer, self.author, self.celebrity, self.other):
+            self.clients[user.pk] = APIClient()
+            self.clients[user.pk].credentials(HTTP_AUTHORIZATION=f"Bearer {user.token()['access']}")
+
+    def client_for(self, user):
+        return self.clients[user.pk]
+
+    def toggle_follow(self, follower, followee):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client_for(follower).post(f'/users/{followee.pk}/follow/')
+        following = response.json()['following']
+        self.assertEqual(response.status_code, 201 if following else 200)
+        return following
+
+    def create_post(self, author):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                post = Post.objects.create(author=author, image='posts/a.jpg', caption='caption')
+                schedule_fanout(post)
+        return post
+
+    def counts(self, user):
+        user.refresh_from_db(fields=['follower_count', 'following_count'])
+        return user.follower_count, user.following_count
+
+    def timeline(self, user):
+        return set(TimelineEntry.objects.filter(user=user).values_list('post_id', flat=True))
+
+    def test_follow_and_unfollow_update_counters(self):
+        self.assertTrue(self.toggle_follow(self.viewer, self.author))
+        self.assertEqual(self.counts(self.viewer), (0, 1))
+        self.assertEqual(self.counts(self.author), (1, 0))
+        self.assertFalse(self.toggle_follow(self.viewer, self.author))
+        self.assertEqual(self.counts(self.viewer), (0, 0))
+        self.assertEqual(self.counts(self.author), (0, 0))
+
+    def test_new_post_is_fanned_out_to_followers(self):
+        self.toggle_follow(self.viewer, self.author)
+        post = self.create_post(self.author)
+        self.assertEqual(self.timeline(self.viewer), {post.pk})
+        post.refresh_from_db()
+        self.assertTrue(post.fanned_out)
+
+    def test_follow_backfills_and_unfollow_removes(self):
+        posts = {self.create_post(self.author).pk for _ in range(3)}
+        self.toggle_follow(self.viewer, self.author)
+        self.assertEqual(self.timeline(self.viewer), posts)
+        self.toggle_follow(self.viewer, self.author)
+        self.assertEqual(self.timeline(self.viewer), set())
+
+    def test_posts_made_above_the_limit_are_refilled(self):
+        self.toggle_follow(self.viewer, self.celebrity)
+        self.toggle_follow(self.other, self.celebrity)
+        post = self.create_post(self.celebrity)
+        self.assertEqual(self.timeline(self.viewer), set())
+        self.toggle_follow(self.other, self.celebrity)
+        self.assertEqual(self.timeline(self.viewer), {post.pk})
+
+    def test_home_feed_merges_celebrity_posts(self):
+        self.toggle_follow(self.viewer, self.author)
+        self.toggle_follow(self.viewer, self.celebrity)
+        self.toggle_follow(self.other, self.celebrity)
+        posts = [self.create_post(author) for author in (self.author, self.celebrity) * 3]
+        self.assertEqual(self.timeline(self.viewer), {post.pk for post in posts[::2]})
+
+        client, url, seen = self.client_for(self.viewer), '/posts/home/?page_size=2', []
+        while url:
+            data = client.get(url).json()
+            seen += [item['id'] for item in data['result']]
+            url = data['next']
+        self.assertEqual(seen, [str(post.pk) for post in reversed(posts)])
+
+
+class TagIndexTest(TestCase):
+
+    def setUp(self):
+        self.author, self.alice, self.bob = (
+            User.objects.create(username=name, email=f'{name}@example.com') for name in ('author', 'alice', 'bob')
+        )
+        self.post = Post.objects.create(author=self.author, image='posts/a.jpg', caption='#one #Two @alice')
+        self.comment = PostComment.objects.create(author=self.alice, post=self.post, comment='#one @bob')
+
+    def caption_tags(self):
+        hashtags = dict(
+            PostHashtag.objects.filter(post=self.post, comment__isnull=True).values_list('hashtag__name', 'pk')
+        )
+        mentions = dict(Mention.objects.filter(post=self.post, comment__isnull=True).values_list('user__username', 'pk'))
+        return hashtags, mentions
+
+    def test_caption_edit_keeps_removes_and_adds_rows(self):
+        hashtags, mentions = self.caption_tags()
+        self.assertEqual(set(hashtags), {'one', 'two'})
+        self.assertEqual(set(mentions), {'alice'})
+
+        self.post.caption = '#two #three @BOB'
+        self.post.save()
+
+        edited_hashtags, edited_mentions = self.caption_tags()
+        self.assertEqual(set(edited_hashtags), {'two', 'three'})
+        self.assertEqual(edited_hashtags['two'], hashtags['two'])
+        self.assertEqual(set(edited_mentions), {'bob'})
+        # the comment's rows belong to another source
+        self.assertEqual(PostHashtag.objects.filter(comment=self.comment).count(), 1)
+        self.assertEqual(Mention.objects.filter(comment=self.comment).count(), 1)
+
+    def test_trending_is_an_ordinary_hashtag(self):
+        post = Post.objects.create(author=self.author, image='posts/a.jpg', caption='#trending')
+        response = self.client.get('/posts/tags/trending/')
+        self.assertEqual([item['id'] for item in response.json()['result']], [str(post.pk)])
+        self.assertEqual(self.client.get('/posts/trending-tags/').status_code, 200)
@@ -0,0 +1,120 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction, connection
+
+from post.models import Post, TimelineEntry
+from users.models import User, Follow
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.TIMELINE_WORKERS, thread_name_prefix='timeline')
+        return _executor
+
+
+def run_job(job, *args):
+    try:
+        job(*args)
+    except Exception:
+        logger.exception("Timeline job %s%r failed", job.__name__, args)
+    finally:
+        connection.close()
+
+
+def submit(job, *args):
+    """Run ``job`` on a timeline worker thread, or inline when TIMELINE_WORKERS is 0."""
+    if settings.TIMELINE_WORKERS <= 0:
+        job(*args)
+        return
+    get_executor().submit(run_job, job, *args)
+
+
+def schedule(job, *args):
+    """Submit ``job`` once the current transaction commits; a failure is logged, never raised into the request."""
+    transaction.on_commit(partial(submit, job, *args), robust=True)
+
+
+def is_celebrity(user):
+    """Accounts with more followers than TIMELINE_FANOUT_LIMIT are merged into feeds on read, not fanned out."""
+    return user.follower_count > settings.TIMELINE_FANOUT_LIMIT
+
+
+def left_celebrity(user):
+    """True for the one unfollow that brings ``user`` (with its updated count) back down to the limit."""
+    return user.follower_count == settings.TIMELINE_FANOUT_LIMIT
+
+
+def entry_for(user_id, post):
+    return TimelineEntry(user_id=user_id, post=post, author_id=post.author_id, post_created_time=post.created_time)
+
+
+def fanout(post):
+    """Write ``post`` into its author's timeline and, unless the author is a celebrity, every follower's."""
+    author = User.objects.only('follower_count').get(pk=post.author_id)
+    TimelineEntry.objects.bulk_create([entry_for(post.author_id, post)], ignore_conflicts=True)
+    if not is_celebrity(author):
+        follower_ids = Follow.objects.filter(followee_id=post.author_id).values_list('follower_id', flat=True)
+        batch = []
+        for follower_id in follower_ids.iterator(chunk_size=settings.TIMELINE_BATCH_SIZE):
+            batch.append(entry_for(follower_id, post))
+            if len(batch) >= settings.TIMELINE_BATCH_SIZE:
+                TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+                batch = []
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+    Post.objects.filter(pk=post.pk, fanned_out=False).update(fanned_out=True)
+
+
+def fanout_post(post_id):
+    post = Post.objects.filter(pk=post_id).first()
+    if post is not None:
+        fanout(post)
+
+
+def schedule_fanout(post):
+    """
+    Fan out on a worker once the post is committed. Posts still not ``fanned_out``
+    (the process died with jobs queued) are picked up by `manage.py fanout_timelines`.
+    """
+    schedule(fanout_post, post.pk)
+
+
+def backfill(follower_id, followee):
+    """Copy the followee's latest TIMELINE_BACKFILL posts into a new follower's timeline."""
+    if is_celebrity(followee):
+        return
+    posts = Post.objects.filter(author=followee).order_by('-created_time', '-id')[:settings.TIMELINE_BACKFILL]
+    TimelineEntry.objects.bulk_create([entry_for(follower_id, post) for post in posts], ignore_conflicts=True)
+
+
+def refill(author_id):
+    """
+    Fan out the author's latest TIMELINE_BACKFILL posts again once it is back at the
+    limit: posts made above it were never written to follower timelines and are no
+    longer merged on read either.
+    """
+    posts = Post.objects.filter(author_id=author_id).order_by('-created_time', '-id')[:settings.TIMELINE_BACKFILL]
+    for post in posts:
+        fanout(post)
+
+
+def remove_author(follower_id, followee_id):
+    TimelineEntry.objects.filter(user_id=follower_id, author_id=followee_id).delete()
+
+
+def celebrity_followees(user):
+    return list(
+        User.objects.filter(
+            followers__follower=user, follower_count__gt=settings.TIMELINE_FANOUT_LIMIT
+        ).values_list('pk', flat=True)
+    )
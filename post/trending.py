@@ -0,0 +1,71 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from post.models import PostHashtag, HashtagBucket
+from shared.response_cache import get_versions, bump_versions
+
+TRENDING_VERSION = 'trending'
+
+
+def bucket_size():
+    return timedelta(minutes=settings.TRENDING_BUCKET_MINUTES)
+
+
+def bucket_start(moment):
+    """Start of the TRENDING_BUCKET_MINUTES window ``moment`` falls into."""
+    size = int(bucket_size().total_seconds())
+    return moment - timedelta(seconds=int(moment.timestamp()) % size, microseconds=moment.microsecond)
+
+
+def rollup(buckets=2):
+    """
+    Recount the last ``buckets`` windows (the open one included) from hashtag uses
+    and store them as HashtagBucket rows. Recounting instead of adding makes a
+    rerun, or a use deleted since the last run, come out right.
+    """
+    size = bucket_size()
+    newest = bucket_start(timezone.now())
+    written = 0
+    for i in range(buckets):
+        start = newest - size * i
+        counts = dict(
+            PostHashtag.objects.filter(created_time__gte=start, created_time__lt=start + size)
+            .order_by().values('hashtag_id').annotate(total=Count('*')).values_list('hashtag_id', 'total')
+        )
+        with transaction.atomic():
+            HashtagBucket.objects.filter(start=start).exclude(hashtag_id__in=counts).delete()
+            HashtagBucket.objects.bulk_create(
+                [HashtagBucket(hashtag_id=pk, start=start, count=total) for pk, total in counts.items()],
+                update_conflicts=True, unique_fields=['hashtag', 'start'], update_fields=['count', 'updated_time'],
+            )
+        written += len(counts)
+    expired, _ = HashtagBucket.objects.filter(
+        start__lt=newest - timedelta(hours=settings.TRENDING_RETENTION_HOURS)
+    ).delete()
+    bump_versions([TRENDING_VERSION])
+    return written, expired
+
+
+def top_hashtags(window=60, limit=10):
+    """
+    The most used hashtags over the last ``window`` minutes, summed from the
+    precomputed buckets and cached until the next rollup or bucket.
+    """
+    newest = bucket_start(timezone.now())
+    version, = get_versions([TRENDING_VERSION])
+    key = f"trending:{version}:{newest.timestamp():.0f}:{window}"
+    top = cache.get(key)
+    if top is None:
+        since = newest - timedelta(minutes=window) + bucket_size()
+        top = list(
+            HashtagBucket.objects.filter(start__gte=since).values('hashtag__name')
+            .annotate(total=Sum('count')).order_by('-total', 'hashtag__name')
+            .values_list('hashtag__name', 'total')[:settings.TRENDING_MAX_LIMIT]
+        )
+        cache.set(key, top, settings.TRENDING_BUCKET_MINUTES * 60)
+    return [{"name": name, "count": total} for name, total in top[:limit]]
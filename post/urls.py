@@ -1,16 +1,25 @@
 from django.urls import path
 
+from post.async_views import AsyncPostListAPIView, AsyncPostRetrieveAPIView, AsyncPostCommentListAPIView
 from post.views import PostRetrieveUpdateDestroyAPIView, PostListCreateAPIView, PostCommentListCreateAPIView, \
     CommentListCreateAPIView, CommentRetrieveDestroyAPIView, \
-    PostLikeAPIView, CommentLikeAPIView
+    PostLikeAPIView, CommentLikeAPIView, BulkLikeAPIView, HomeFeedAPIView, HashtagFeedAPIView, TrendingHashtagsAPIView
 
 urlpatterns = [
     path('list-create/', PostListCreateAPIView.as_view()),
+    path('home/', HomeFeedAPIView.as_view()),
+    path('trending-tags/', TrendingHashtagsAPIView.as_view()),
+    path('tags/<str:name>/', HashtagFeedAPIView.as_view()),
     path('<uuid:pk>/', PostRetrieveUpdateDestroyAPIView.as_view()),
     path('<uuid:pk>/comments/', PostCommentListCreateAPIView.as_view()),
     path('comments/list-create/', CommentListCreateAPIView.as_view()),
     path('comments/<uuid:pk>/', CommentRetrieveDestroyAPIView.as_view()),
     path('<uuid:pk>/create-delete-like/', PostLikeAPIView.as_view()),
     path('comments/<uuid:pk>/create-delete-like/', CommentLikeAPIView.as_view()),
+    path('likes/bulk/', BulkLikeAPIView.as_view()),
+    # async read path for ASGI deployments
+    path('async/list/', AsyncPostListAPIView.as_view()),
+    path('async/<uuid:pk>/', AsyncPostRetrieveAPIView.as_view()),
+    path('async/<uuid:pk>/comments/', AsyncPostCommentListAPIView.as_view()),
 
 ]
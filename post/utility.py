@@ -0,0 +1,125 @@
+from collections import defaultdict
+
+from django.db import transaction, IntegrityError
+from django.db.models import F
+from rest_framework.exceptions import NotFound
+
+from post.models import Post, PostComment, PostLike, CommentLike
+from shared.response_cache import bump_versions
+
+
+class CommentTree:
+    """
+    The replies under the given comments' threads loaded in one query and linked
+    in memory by parent_id, with the viewer's likes batch-loaded.
+    """
+
+    def __init__(self, comments, user=None, liked=None):
+        self.children = defaultdict(list)
+        for comment in comments:
+            if comment.parent_id is not None:
+                self.children[comment.parent_id].append(comment)
+
+        if liked is not None:
+            self.liked = set(liked)
+        elif user is not None and user.is_authenticated:
+            comment_ids = [comment.pk for comment in comments]
+            self.liked = set(
+                CommentLike.objects.filter(comment_id__in=comment_ids, author=user).values_list('comment_id', flat=True)
+            )
+        else:
+            self.liked = set()
+
+    @classmethod
+    def for_comments(cls, comments, user=None):
+        replies = list(cls.replies_in({comment.root_id or comment.pk for comment in comments}))
+        loaded = {reply.pk for reply in replies}
+        return cls(replies + [comment for comment in comments if comment.pk not in loaded], user)
+
+    @staticmethod
+    def replies_in(root_ids):
+        """Every reply under the threads started by ``root_ids`` (ids or a subquery of them)."""
+        return PostComment.objects.filter(root_id__in=root_ids).select_related('author').order_by('created_time', 'id')
+
+    def get_replies(self, comment):
+        return self.children.get(comment.pk, [])
+
+    def is_liked(self, comment):
+        return comment.pk in self.liked
+
+
+def change_counter(model, pk, field, delta=1):
+    """Atomic in-database ``field += delta``; call inside the write's transaction."""
+    if pk is None or not delta:
+        return 0
+    return model.objects.filter(pk=pk).update(**{field: F(field) + delta})
+
+
+def change_comment_counters(comment: PostComment, delta):
+    """``delta`` is the number of comments added or removed (a deleted comment takes its replies with it)."""
+    change_counter(Post, comment.post_id, 'comment_count', delta)
+    change_counter(PostComment, comment.parent_id, 'reply_count', 1 if delta > 0 else -1)
+
+
+LIKE_TARGETS = {
+    'post': (Post, PostLike, 'post_id'),
+    'comment': (PostComment, CommentLike, 'comment_id'),
+}
+
+
+def add_like(target, user, pk):
+    """
+    Insert the like unless it already exists. A concurrent duplicate insert hits the
+    unique constraint inside a savepoint and is treated as "already liked".
+    Returns the new like, or None if nothing changed.
+    """
+    model, like_model, fk = LIKE_TARGETS[target]
+    try:
+        with transaction.atomic():
+            like = like_model.objects.create(author=user, **{fk: pk})
+    except IntegrityError:
+        return None
+    if not change_counter(model, pk, 'like_count', 1):
+        raise NotFound(f"{target.capitalize()} not found")
+    return like
+
+
+def remove_like(target, user, pk):
+    model, like_model, fk = LIKE_TARGETS[target]
+    deleted, _ = like_model.objects.filter(author=user, **{fk: pk}).delete()
+    if deleted:
+        change_counter(model, pk, 'like_count', -deleted)
+    return bool(deleted)
+
+
+def toggle_like(target, user, pk):
+    """Delete-or-insert in one transaction; returns ``(like, liked)``."""
+    if remove_like(target, user, pk):
+        return None, False
+    return add_like(target, user, pk), True
+
+
+# response cache versions: the feed, and one per post covering its detail and comments
+FEED_VERSION = 'posts'
+
+
+def post_version(pk):
+    return f"post:{pk}"
+
+
+def invalidate_post_responses(post_ids=(), feed=True):
+    """
+    Bump the given posts' versions and, with ``feed``, the feed's. Likes and comments only
+    change counters, so they pass ``feed=False``: bumping the feed on every like would keep
+    the busiest cached list permanently cold, and the counts on it may lag by
+    RESPONSE_CACHE_TTL (plus the stale window) instead.
+    """
+    names = [post_version(pk) for pk in post_ids if pk is not None]
+    if feed:
+        names.append(FEED_VERSION)
+    bump_versions(names)
+
+
+def get_like_counts(target, pks):
+    model = LIKE_TARGETS[target][0]
+    return {str(pk): count for pk, count in model.objects.filter(pk__in=pks).values_list('pk', 'like_count')}
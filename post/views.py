@@ -1,36 +1,150 @@
+from django.conf import settings
+from django.db import transaction
 from rest_framework import permissions, status
-from rest_framework.generics import RetrieveUpdateDestroyAPIView, ListCreateAPIView, RetrieveDestroyAPIView
+from rest_framework.generics import RetrieveUpdateDestroyAPIView, ListCreateAPIView, RetrieveDestroyAPIView, \
+    ListAPIView
 from rest_framework.response import Response
 from rest_framework.status import HTTP_200_OK, HTTP_204_NO_CONTENT
 from rest_framework.views import APIView
 
-from post.models import Post, PostComment, PostLike, CommentLike
-from post.serializers import PostSerializer, PostCommentSerializer, PostLikeSerializer, CommentLikeSerializer
-from shared.custom_pagination import CustomPagination
+from post.image_pipeline import schedule_variants, variant_names
+from post.models import Post, PostComment, TimelineEntry, PostHashtag
+from post.serializers import PostSerializer, PostCommentSerializer, PostLikeSerializer, CommentLikeSerializer, \
+    BulkLikeSerializer
+from post.utility import change_comment_counters, toggle_like, add_like, remove_like, get_like_counts, LIKE_TARGETS, \
+    FEED_VERSION, post_version, invalidate_post_responses
+from post.tags import normalize_hashtag
+from post.timeline import schedule_fanout, celebrity_followees
+from post.trending import top_hashtags
+from shared.custom_pagination import CustomCursorPagination
+from shared.response_cache import AnonymousResponseCacheMixin
+from shared.storage import release_files
 
 
-class PostListCreateAPIView(ListCreateAPIView):
+class PostListCreateAPIView(AnonymousResponseCacheMixin, ListCreateAPIView):
     serializer_class = PostSerializer
     permission_classes = (permissions.IsAuthenticatedOrReadOnly,)
-    pagination_class = CustomPagination
+    pagination_class = CustomCursorPagination
+    response_cache_scope = 'post_list'
+
+    def get_response_versions(self):
+        return [FEED_VERSION]
 
     def get_queryset(self):
-        return Post.objects.all()
+        return Post.objects.feed(self.request.user)
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+        post = serializer.save(author=self.request.user)
+        schedule_variants(post)
+        schedule_fanout(post)
+        invalidate_post_responses()
 
 
-class PostRetrieveUpdateDestroyAPIView(RetrieveUpdateDestroyAPIView):
-    queryset = Post.objects.all()
+class HomeFeedAPIView(ListAPIView):
+    """
+    The viewer's materialized timeline, read with one keyset range scan, merged
+    with the latest posts of followed accounts too big to fan out on write.
+    """
+    serializer_class = PostSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = CustomCursorPagination
+
+    def list(self, request, *args, **kwargs):
+        user = self.request.user
+        paginator = self.paginator
+        entries = paginator.get_page_queryset(
+            TimelineEntry.objects.filter(user=user).feed(user), request, ordering=("-post_created_time", "-post_id")
+        )
+        posts = {post.pk: post for post in entries.posts()}
+
+        celebrities = celebrity_followees(user)
+        if celebrities:
+            pulled = paginator.get_page_queryset(Post.objects.feed(user).filter(author_id__in=celebrities), request)
+            for post in pulled:
+                posts.setdefault(post.pk, post)
+            # both sources are already cut at the same cursor, so the merged page is their top rows
+            posts = sorted(posts.values(), key=lambda post: (post.created_time, post.pk),
+                           reverse=not paginator.is_reversed())
+        else:
+            posts = list(posts.values())
+
+        page = paginator.set_page(posts[:paginator.page_size_value + 1])
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+
+class HashtagFeedAPIView(ListAPIView):
+    """Posts whose caption uses the hashtag, newest first, from the (hashtag, post_created_time, post) index."""
+    serializer_class = PostSerializer
+    permission_classes = (permissions.AllowAny,)
+    pagination_class = CustomCursorPagination
+
+    def list(self, request, *args, **kwargs):
+        paginator = self.paginator
+        entries = paginator.get_page_queryset(
+            PostHashtag.objects.filter(hashtag__name=normalize_hashtag(self.kwargs['name']), comment__isnull=True)
+            .feed(request.user),
+            request,
+            ordering=("-post_created_time", "-post_id"),
+        )
+        page = paginator.set_page(entries.posts())
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+
+class TrendingHashtagsAPIView(APIView):
+    permission_classes = (permissions.AllowAny,)
+
+    def get(self, request):
+        window = self.get_int_param(
+            'window', 60, settings.TRENDING_BUCKET_MINUTES, settings.TRENDING_RETENTION_HOURS * 60
+        )
+        limit = self.get_int_param('limit', 10, 1, settings.TRENDING_MAX_LIMIT)
+        # whole buckets only, so every window maps onto the same few cache keys
+        window -= window % settings.TRENDING_BUCKET_MINUTES
+        return Response(
+            {
+                "success": True,
+                "window": window,
+                "data": top_hashtags(window, limit),
+            }
+        )
+
+    def get_int_param(self, name, default, minimum, maximum):
+        try:
+            value = int(self.request.query_params[name])
+        except (KeyError, ValueError):
+            return default
+        return max(minimum, min(value, maximum))
+
+
+class PostRetrieveUpdateDestroyAPIView(AnonymousResponseCacheMixin, RetrieveUpdateDestroyAPIView):
     serializer_class = PostSerializer
     permission_classes = (permissions.IsAuthenticatedOrReadOnly,)
+    response_cache_scope = 'post_detail'
+
+    def get_response_versions(self):
+        return [post_version(self.kwargs['pk'])]
+
+    def get_queryset(self):
+        return Post.objects.feed(self.request.user)
+
+    def perform_update(self, serializer):
+        post = serializer.save()
+        invalidate_post_responses([post.pk])
 
     def put(self, request, *args, **kwargs):
         post = self.get_object()
         serializer = self.serializer_class(post, data=request.data)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        if 'image' in serializer.validated_data:
+            replaced = [post.image.name, *variant_names(post.image_variants)]
+            post = serializer.save(image_variants={})
+            schedule_variants(post)
+            release_files(replaced)
+        else:
+            serializer.save()
+        invalidate_post_responses([post.pk])
         return Response(
             {
                 "success": True,
@@ -43,6 +157,8 @@ class PostRetrieveUpdateDestroyAPIView(RetrieveUpdateDestroyAPIView):
     def delete(self, request, *args, **kwargs):
         post = self.get_object()
         post.delete()
+        release_files([post.image.name, *variant_names(post.image_variants)])
+        invalidate_post_responses([self.kwargs['pk']])
         return Response(
             {
                 "success": True,
@@ -52,38 +168,51 @@ class PostRetrieveUpdateDestroyAPIView(RetrieveUpdateDestroyAPIView):
         )
 
 
-class PostCommentListCreateAPIView(ListCreateAPIView):
+class PostCommentListCreateAPIView(AnonymousResponseCacheMixin, ListCreateAPIView):
     serializer_class = PostCommentSerializer
     permission_classes = (permissions.IsAuthenticatedOrReadOnly,)
-    pagination_class = CustomPagination
+    pagination_class = CustomCursorPagination
+    response_cache_scope = 'post_comments'
+
+    def get_response_versions(self):
+        return [post_version(self.kwargs['pk'])]
 
+    @transaction.atomic
     def perform_create(self, serializer):
         post_id = self.kwargs['pk']
-        serializer.save(author=self.request.user, post_id=post_id)
+        comment = serializer.save(author=self.request.user, post_id=post_id)
+        change_comment_counters(comment, 1)
+        invalidate_post_responses([post_id], feed=False)
 
     def get_queryset(self):
         post_id = self.kwargs['pk']
-        return PostComment.objects.filter(post__id=post_id)
+        return PostComment.objects.filter(post__id=post_id, parent__isnull=True).select_related('author')
 
 
 class CommentListCreateAPIView(ListCreateAPIView):
-    queryset = PostComment.objects.all()
+    queryset = PostComment.objects.select_related('author')
     permission_classes = (permissions.IsAuthenticatedOrReadOnly,)
     serializer_class = PostCommentSerializer
-    pagination_class = CustomPagination
+    pagination_class = CustomCursorPagination
 
+    @transaction.atomic
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+        comment = serializer.save(author=self.request.user)
+        change_comment_counters(comment, 1)
+        invalidate_post_responses([comment.post_id], feed=False)
 
 
 class CommentRetrieveDestroyAPIView(RetrieveDestroyAPIView):
     permission_classes = (permissions.IsAuthenticatedOrReadOnly,)
     serializer_class = PostCommentSerializer
-    queryset = PostComment.objects.all()
+    queryset = PostComment.objects.select_related('author')
 
     def delete(self, request, *args, **kwargs):
         comment = self.get_object()
-        comment.delete()
+        with transaction.atomic():
+            _, deleted = comment.delete()
+            change_comment_counters(comment, -deleted.get(PostComment._meta.label, 1))
+            invalidate_post_responses([comment.post_id], feed=False)
         return Response(
             {
                 "success": True,
@@ -94,61 +223,103 @@ class CommentRetrieveDestroyAPIView(RetrieveDestroyAPIView):
 
 
 class PostLikeAPIView(APIView):
+    @transaction.atomic
     def post(self, request, pk):
-        try:
-            post_like = PostLike.objects.get(
-                author=self.request.user,
-                post_id=pk
-            )
-            post_like.delete()
-            return Response(
-                {
-                    "success": True,
-                    "message": "Postga bosilgan like muvaffaqiyatli o'chirildi"
-                },
-                status=status.HTTP_204_NO_CONTENT
-            )
-        except PostLike.DoesNotExist:
-            post_like = PostLike.objects.create(
-                author=self.request.user,
-                post_id=pk
-            )
-            serializer = PostLikeSerializer(post_like)
+        post_like, liked = toggle_like('post', self.request.user, pk)
+        like_count = get_like_counts('post', [pk]).get(str(pk), 0)
+        invalidate_post_responses([pk], feed=False)
+        if not liked:
             return Response(
                 {
                     "success": True,
-                    "message": "Post ga like muvaffaqiyatli qo'shildi",
-                    "data": serializer.data
+                    "message": "Postga bosilgan like muvaffaqiyatli o'chirildi",
+                    "liked": False,
+                    "like_count": like_count,
                 },
-                status=status.HTTP_201_CREATED
+                status=status.HTTP_200_OK
             )
+        return Response(
+            {
+                "success": True,
+                "message": "Post ga like muvaffaqiyatli qo'shildi",
+                "liked": True,
+                "like_count": like_count,
+                "data": PostLikeSerializer(post_like).data if post_like is not None else None
+            },
+            status=status.HTTP_201_CREATED
+        )
 
 
 class CommentLikeAPIView(APIView):
 
+    @transaction.atomic
     def post(self, request, pk):
-        try:
-            comment_like = CommentLike.objects.get(
-                author=self.request.user,
-                comment_id=pk
-            )
-            comment_like.delete()
-            return Response(
-                {
-                    "success": True,
-                    "message": "Commentga bosilgan like o'chirildi"
-                }
-            )
-        except CommentLike.DoesNotExist:
-            comment_like = CommentLike.objects.create(
-                author=self.request.user,
-                comment_id=pk
-            )
-            serializer = CommentLikeSerializer(comment_like)
+        comment_like, liked = toggle_like('comment', self.request.user, pk)
+        like_count = get_like_counts('comment', [pk]).get(str(pk), 0)
+        post_id = PostComment.objects.filter(pk=pk).values_list('post_id', flat=True).first()
+        invalidate_post_responses([post_id], feed=False)
+        if not liked:
             return Response(
                 {
                     "success": True,
-                    "message": "Commentga like bosildi",
-                    "data": serializer.data
+                    "message": "Commentga bosilgan like o'chirildi",
+                    "liked": False,
+                    "like_count": like_count,
                 }
             )
+        return Response(
+            {
+                "success": True,
+                "message": "Commentga like bosildi",
+                "liked": True,
+                "like_count": like_count,
+                "data": CommentLikeSerializer(comment_like).data if comment_like is not None else None
+            }
+        )
+
+
+class BulkLikeAPIView(APIView):
+    serializer_class = BulkLikeSerializer
+
+    @transaction.atomic
+    def post(self, request, *args, **kwargs):
+        serializer = self.serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        actions = serializer.validated_data['actions']
+
+        existing = {
+            target: set(get_like_counts(target, {str(action['id']) for action in actions if action['type'] == target}))
+            for target in LIKE_TARGETS
+        }
+        results = []
+        for action in actions:
+            target, pk = action['type'], str(action['id'])
+            if pk not in existing[target]:
+                results.append({"type": target, "id": pk, "found": False})
+                continue
+            if action['action'] == 'like':
+                add_like(target, self.request.user, pk)
+            else:
+                remove_like(target, self.request.user, pk)
+            results.append({"type": target, "id": pk, "found": True, "liked": action['action'] == 'like'})
+
+        like_counts = {
+            target: get_like_counts(target, existing[target])
+            for target in LIKE_TARGETS
+        }
+        for result in results:
+            if result['found']:
+                result['like_count'] = like_counts[result['type']].get(result['id'], 0)
+
+        changed = {target: [result['id'] for result in results if result['found'] and result['type'] == target]
+                   for target in LIKE_TARGETS}
+        comment_post_ids = set(
+            PostComment.objects.filter(pk__in=changed['comment']).values_list('post_id', flat=True)
+        ) if changed['comment'] else set()
+        invalidate_post_responses([*changed['post'], *comment_post_ids], feed=False)
+        return Response(
+            {
+                "success": True,
+                "data": results
+            }
+        )
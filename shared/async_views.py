@@ -0,0 +1,75 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.http import HttpResponseNotAllowed
+from django.views import View
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.views import exception_handler
+
+
+def evaluate(queryset):
+    try:
+        return list(queryset)
+    finally:
+        connection.close_if_unusable_or_obsolete()
+
+
+async def gather_queries(*querysets):
+    """
+    Evaluate independent querysets at the same time. Django's async ORM runs every
+    query on the one thread-sensitive executor, one after another, so here each
+    queryset gets a worker thread (and database connection) of its own.
+    """
+    return await asyncio.gather(*(sync_to_async(evaluate, thread_sensitive=False)(qs) for qs in querysets))
+
+
+class AsyncReadAPIView(View):
+    """
+    Read-only async counterpart of a DRF view for the ASGI path: the request is
+    authenticated by DEFAULT_AUTHENTICATION_CLASSES in order, JWT users come from the
+    auth cache without a thread hop (``aauthenticate``) and the other classes run
+    through sync_to_async. Errors go through DRF's exception handler and responses
+    through its JSON renderer, so the payloads match the sync views.
+    """
+    http_method_names = ['get']
+    authentication_classes = api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    renderer = JSONRenderer()
+
+    def get_authenticators(self):
+        return [auth() for auth in self.authentication_classes]
+
+    @staticmethod
+    async def authenticate(authenticators, request, drf_request):
+        for authenticator in authenticators:
+            if hasattr(authenticator, 'aauthenticate'):
+                authenticated = await authenticator.aauthenticate(request)
+            else:
+                authenticated = await sync_to_async(authenticator.authenticate)(drf_request)
+            if authenticated is not None:
+                return authenticated
+        return None
+
+    async def dispatch(self, request, *args, **kwargs):
+        if request.method.lower() not in self.http_method_names:
+            return HttpResponseNotAllowed([method.upper() for method in self.http_method_names])
+        authenticators = self.get_authenticators()
+        drf_request = Request(request, authenticators=authenticators)
+        try:
+            authenticated = await self.authenticate(authenticators, request, drf_request)
+            drf_request.user, drf_request.auth = authenticated or (AnonymousUser(), None)
+            response = await getattr(self, request.method.lower())(drf_request, *args, **kwargs)
+        except Exception as exc:
+            response = exception_handler(exc, {'request': drf_request, 'view': self})
+            if response is None:
+                raise
+            if response.status_code == status.HTTP_401_UNAUTHORIZED and authenticators:
+                response['WWW-Authenticate'] = authenticators[0].authenticate_header(drf_request)
+        response.accepted_renderer = self.renderer
+        response.accepted_media_type = self.renderer.media_type
+        response.renderer_context = {'request': drf_request, 'view': self, 'response': response}
+        return response.render()
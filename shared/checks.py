@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+LOCMEM_CACHE = 'django.core.cache.backends.locmem.LocMemCache'
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """OTP codes, throttles and token revocations must be seen by every worker process."""
+    if settings.CACHES['default']['BACKEND'] != LOCMEM_CACHE:
+        return []
+    return [
+        Error(
+            "CACHE_BACKEND is LocMemCache, which every worker process keeps separately.",
+            hint="Point CACHE_BACKEND at a shared cache: FileBasedCache on one host, memcached or redis across hosts.",
+            id='shared.E001',
+        )
+    ]
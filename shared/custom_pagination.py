@@ -1,5 +1,13 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import json
+import uuid
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination, BasePagination
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param, remove_query_param
 
 
 class CustomPagination(PageNumberPagination):
@@ -17,3 +25,150 @@ class CustomPagination(PageNumberPagination):
                 "result": data
             }
         )
+
+
+class CustomCursorPagination(BasePagination):
+    """
+    Keyset pagination on (created_time, id): no COUNT(*) and no OFFSET scan,
+    every page is a single indexed range query.
+    """
+    page_size = 10
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    ordering = ("-created_time", "-id")
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(list(self.get_page_queryset(queryset, request)))
+
+    def get_page_queryset(self, queryset, request, ordering=None):
+        """
+        The page query, one row past the page size; evaluate it and pass the rows to set_page().
+        ``ordering`` names the (time, id) columns when the queryset isn't of the paginated model,
+        e.g. ("-post_created_time", "-post_id") for timeline entries that are paged as posts.
+        """
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size_value = self.get_page_size(request)
+        self.cursor = self.decode_cursor(request)
+
+        ordering = self.get_ordering(self.is_reversed(), ordering)
+        queryset = queryset.order_by(*ordering)
+        if self.cursor is not None:
+            queryset = queryset.filter(self.get_position_filter(ordering, self.cursor['position']))
+        return queryset[:self.page_size_value + 1]
+
+    def set_page(self, results):
+        has_more = len(results) > self.page_size_value
+        results = results[:self.page_size_value]
+        if self.is_reversed():
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "result": data
+            }
+        )
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_ordering(self, reverse=False, ordering=None):
+        ordering = ordering or self.ordering
+        if not reverse:
+            return ordering
+        return tuple(field[1:] if field.startswith('-') else f"-{field}" for field in ordering)
+
+    def is_reversed(self):
+        return self.cursor is not None and self.cursor['reverse']
+
+    @staticmethod
+    def get_position_filter(ordering, position):
+        time_field, id_field = (field.lstrip('-') for field in ordering)
+        lookup = 'lt' if ordering[0].startswith('-') else 'gt'
+        created_time, pk = position
+        return (
+                Q(**{f"{time_field}__{lookup}": created_time}) |
+                Q(**{time_field: created_time, f"{id_field}__{lookup}": pk})
+        )
+
+    def get_position(self, instance):
+        time_field, id_field = (field.lstrip('-') for field in self.ordering)
+        return self.dump_key(getattr(instance, time_field)), str(getattr(instance, id_field))
+
+    @staticmethod
+    def dump_key(value):
+        return value.isoformat()
+
+    @staticmethod
+    def load_key(value):
+        return datetime.fromisoformat(value)
+
+    @staticmethod
+    def load_pk(value):
+        return uuid.UUID(value)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.get_position(self.page[-1]), reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.get_position(self.page[0]), reverse=True)
+
+    def encode_cursor(self, position, reverse):
+        payload = json.dumps({"p": position, "r": int(reverse)}, separators=(',', ':'))
+        encoded = base64.urlsafe_b64encode(payload.encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            key, pk = payload['p']
+            return {
+                'position': (self.load_key(key), self.load_pk(pk)),
+                'reverse': bool(payload['r']),
+            }
+        except (TypeError, ValueError, KeyError, AttributeError):
+            raise NotFound(self.invalid_cursor_message)
+
+
+class RankCursorPagination(CustomCursorPagination):
+    """
+    Keyset pagination on (rank, id) for relevance-ranked results, best match first.
+    The rank goes into the cursor as ``float.hex()``, so rows tied on it compare
+    equal to the cursor exactly; ranks must be double precision in the database
+    (see shared.search).
+    """
+    ordering = ("-rank", "-id")
+
+    @staticmethod
+    def dump_key(value):
+        return float(value).hex()
+
+    @staticmethod
+    def load_key(value):
+        return float.fromhex(value)
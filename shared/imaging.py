@@ -0,0 +1,49 @@
+import io
+
+from PIL import Image, ImageOps
+
+FORMAT_OPTIONS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def render_variants(data, widths, formats):
+    """
+    Decode the upload once, apply and drop EXIF orientation, and encode every
+    (width, format) pair. Widths larger than the original are skipped, except the
+    smallest so that there is always at least one variant. Pure Pillow, no Django,
+    so it can run in a spawned worker process.
+    """
+    with Image.open(io.BytesIO(data)) as source:
+        image = ImageOps.exif_transpose(source)
+        image.load()
+
+    variants = {}
+    widths = sorted(widths)
+    for width in widths:
+        if width > image.width and width != widths[0]:
+            continue
+        resized = image
+        if image.width > width:
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.Resampling.LANCZOS)
+        for fmt in formats:
+            pil_format, options = FORMAT_OPTIONS[fmt]
+            frame = resized
+            if pil_format == 'JPEG' and frame.mode != 'RGB':
+                frame = flatten(frame)
+            elif frame.mode not in ('RGB', 'RGBA'):
+                frame = frame.convert('RGBA' if 'A' in frame.getbands() else 'RGB')
+            buffer = io.BytesIO()
+            # no exif= argument: the re-encoded variants carry no EXIF/GPS metadata
+            frame.save(buffer, pil_format, **options)
+            variants[(min(width, image.width), fmt)] = buffer.getvalue()
+    return variants
+
+
+def flatten(image):
+    image = image.convert('RGBA')
+    background = Image.new('RGB', image.size, (255, 255, 255))
+    background.paste(image, mask=image.getchannel('A'))
+    return background
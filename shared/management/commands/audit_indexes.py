@@ -0,0 +1,92 @@
+import re
+import uuid
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from post.models import Post, PostComment
+from post.utility import CommentTree
+from post.views import PostListCreateAPIView, PostRetrieveUpdateDestroyAPIView, PostCommentListCreateAPIView
+from users.models import User, UserConfirmation
+
+SEQ_SCAN_PATTERNS = {
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    'sqlite': re.compile(r'\bSCAN (\w+)\b(?! USING)'),
+}
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN the hot query shapes of the API views and report sequential scans"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fail-on-seq-scan', action='store_true',
+                            help="Exit with an error if any query plan has a sequential scan (for CI)")
+        parser.add_argument('--allow-seq-scan', action='store_true',
+                            help="Don't disable sequential scans on PostgreSQL while planning")
+        parser.add_argument('--verbose-plans', action='store_true')
+
+    def handle(self, *args, **options):
+        pattern = SEQ_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            raise CommandError(f"Unsupported database vendor: {connection.vendor}")
+
+        failures = []
+        for name, queryset in self.get_querysets():
+            plan = self.explain(queryset, options['allow_seq_scan'])
+            scans = sorted(set(pattern.findall(plan)))
+            if scans:
+                failures.append(name)
+                self.stdout.write(self.style.WARNING(f"{name}: sequential scan on {', '.join(scans)}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"{name}: ok"))
+            if options['verbose_plans'] or scans:
+                self.stdout.write(plan)
+
+        if failures and options['fail_on_seq_scan']:
+            raise CommandError(f"Sequential scans in: {', '.join(failures)}")
+
+    @staticmethod
+    def explain(queryset, allow_seq_scan):
+        # tiny CI tables are always cheaper to scan, so ask the planner whether an index path exists at all
+        with transaction.atomic():
+            if connection.vendor == 'postgresql' and not allow_seq_scan:
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL enable_seqscan = off")
+            return queryset.explain()
+
+    @staticmethod
+    def view_queryset(view_class, user, **kwargs):
+        view = view_class()
+        view.request = APIRequestFactory().get('/')
+        view.request.user = user
+        view.kwargs = kwargs
+        view.format_kwarg = None
+        queryset = view.get_queryset()
+        paginator = getattr(view_class, 'pagination_class', None)
+        if paginator is not None and hasattr(paginator, 'ordering'):
+            queryset = queryset.order_by(*paginator.ordering)
+        return queryset
+
+    def get_querysets(self):
+        user = User.objects.order_by().first() or AnonymousUser()
+        post_id = Post.objects.order_by().values_list('pk', flat=True).first() or uuid.uuid4()
+        now = timezone.now()
+
+        return [
+            ('post list', self.view_queryset(PostListCreateAPIView, user)[:11]),
+            ('post detail', self.view_queryset(PostRetrieveUpdateDestroyAPIView, user).filter(pk=post_id)),
+            ('post comments', self.view_queryset(PostCommentListCreateAPIView, user, pk=post_id)[:11]),
+            ('comment tree', CommentTree.replies_in(
+                PostComment.objects.filter(post_id=post_id, parent__isnull=True).values('pk')[:11])),
+            ('active verification code', UserConfirmation.objects.filter(user_id=getattr(user, 'pk', None)).order_by(
+                '-created_time')[:1]),
+            ('purge verification codes', UserConfirmation.objects.filter(expiration_time__lt=now).order_by(
+                'expiration_time').values_list('pk', flat=True)[:1000]),
+            ('login by email', User.objects.filter(email__iexact='user@example.com')),
+            ('login by phone', User.objects.filter(phone_number='+998900000000')),
+            ('login by username', User.objects.filter(username='username')),
+            ('pending fan-out', Post.objects.filter(fanned_out=False, created_time__lte=now).order_by('created_time')[:100]),
+        ]
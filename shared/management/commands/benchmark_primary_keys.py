@@ -0,0 +1,75 @@
+import random
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection, models, transaction
+
+from shared.models import uuid7
+
+
+def bench_model(name, pk_field):
+    meta = type('Meta', (), {'app_label': 'shared', 'db_table': f'bench_{name.lower()}', 'managed': False})
+    return type(name, (models.Model,), {
+        '__module__': __name__,
+        'Meta': meta,
+        'id': pk_field,
+        'payload': models.CharField(max_length=32),
+    })
+
+
+VarcharUUID4 = bench_model(
+    'BenchVarcharUUID4', models.URLField(primary_key=True, default=uuid.uuid4, editable=False)
+)
+NativeUUID7 = bench_model(
+    'BenchNativeUUID7', models.UUIDField(primary_key=True, default=uuid7, editable=False)
+)
+
+
+class Command(BaseCommand):
+    help = "Compare insert and lookup speed of varchar UUIDv4 keys (old BaseModel.id) and native UUIDv7 keys"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100_000)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--lookups', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        for model in (VarcharUUID4, NativeUUID7):
+            with connection.schema_editor() as schema_editor:
+                schema_editor.create_model(model)
+            try:
+                self.run(model, options['rows'], options['batch_size'], options['lookups'])
+            finally:
+                with connection.schema_editor() as schema_editor:
+                    schema_editor.delete_model(model)
+
+    def run(self, model, rows, batch_size, lookups):
+        started = time.perf_counter()
+        for offset in range(0, rows, batch_size):
+            with transaction.atomic():
+                model.objects.bulk_create(
+                    [model(payload=str(i)) for i in range(offset, min(offset + batch_size, rows))]
+                )
+        insert_time = time.perf_counter() - started
+
+        ids = list(model.objects.values_list('pk', flat=True))
+        sample = random.sample(ids, min(lookups, len(ids)))
+        started = time.perf_counter()
+        for pk in sample:
+            model.objects.filter(pk=pk).values_list('payload', flat=True).first()
+        lookup_time = time.perf_counter() - started
+
+        self.stdout.write(
+            f"{model.__name__}: insert {rows} rows in {insert_time:.2f}s ({rows / insert_time:.0f} rows/s), "
+            f"{len(sample)} pk lookups in {lookup_time:.2f}s ({lookup_time / max(len(sample), 1) * 1e6:.0f} us/lookup)"
+            f"{self.index_size(model)}"
+        )
+
+    @staticmethod
+    def index_size(model):
+        if connection.vendor != 'postgresql':
+            return ""
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_indexes_size(%s)", [model._meta.db_table])
+            return f", index size {cursor.fetchone()[0] // 1024} KiB"
@@ -0,0 +1,113 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from post.models import Post
+from shared.custom_pagination import RankCursorPagination
+from shared.search import search_posts
+from users.models import User
+
+SYLLABLES = ['ka', 'lo', 'mi', 'tur', 'sa', 'na', 'ro', 'bek', 'zi', 'da', 'yu', 'qo', 'shi', 'van', 'te', 'gul']
+
+
+class Command(BaseCommand):
+    help = ("Fill posts with synthetic captions (1M by default) and time relevance-ranked caption search "
+            "against the icontains scan it replaces")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--captions', type=int, default=1_000_000)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--queries', type=int, default=20, help="Runs of each search")
+        parser.add_argument('--vocabulary', type=int, default=20_000)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--skip-scan', action='store_true', help="Don't time the icontains baseline")
+        parser.add_argument('--keep', action='store_true', help="Keep the generated posts")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        vocabulary = sorted({
+            ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(options['vocabulary'])
+        })
+        rng.shuffle(vocabulary)
+        # word frequencies follow Zipf's law, as in real text
+        weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+        author, _ = User.objects.get_or_create(username='search-benchmark', defaults={'is_active': False})
+
+        started = time.perf_counter()
+        self.fill(author, vocabulary, weights, rng, options['captions'], options['batch_size'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"inserted {options['captions']} captions in {elapsed:.1f}s "
+                          f"({options['captions'] / elapsed:.0f}/s, index maintenance included)")
+
+        try:
+            queries = {
+                'common word': vocabulary[0],
+                'mid word': vocabulary[100],
+                'rare word': vocabulary[-1],
+                'two words': f"{vocabulary[3]} {vocabulary[40]}",
+                'prefix': vocabulary[10][:3],
+                'no match': 'xyzzy',
+            }
+            for name, text in queries.items():
+                self.report(name, 'index', self.time_search(text, options['queries']))
+                if not options['skip_scan']:
+                    self.report(name, 'icontains', self.time_scan(text.split()[0], max(1, options['queries'] // 10)))
+        finally:
+            if not options['keep']:
+                self.clear(author, options['batch_size'])
+
+    @staticmethod
+    def fill(author, vocabulary, weights, rng, captions, batch_size):
+        cum_weights = []
+        total = 0
+        for weight in weights:
+            total += weight
+            cum_weights.append(total)
+        for offset in range(0, captions, batch_size):
+            posts = [
+                Post(author=author, image='posts/search-benchmark.jpg',
+                     caption=' '.join(rng.choices(vocabulary, cum_weights=cum_weights, k=rng.randint(5, 20))))
+                for _ in range(min(batch_size, captions - offset))
+            ]
+            with transaction.atomic():
+                Post.objects.bulk_create(posts)
+
+    @staticmethod
+    def time_search(text, runs):
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            queryset = search_posts(text).order_by(*RankCursorPagination.ordering)
+            results = list(queryset[:RankCursorPagination.page_size + 1])
+            timings.append(time.perf_counter() - started)
+        return timings, len(results)
+
+    @staticmethod
+    def time_scan(word, runs):
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            results = list(Post.objects.filter(caption__icontains=word).order_by('-created_time', '-id')[:11])
+            timings.append(time.perf_counter() - started)
+        return timings, len(results)
+
+    def report(self, name, path, run):
+        timings, rows = run
+        latency = sorted(seconds * 1000 for seconds in timings)
+        self.stdout.write(
+            f"{name:>12} {path:>9}: p50 {statistics.median(latency):8.1f}ms "
+            f"p99 {latency[min(len(latency) - 1, int(len(latency) * 0.99))]:8.1f}ms, first page {rows} rows"
+        )
+
+    @staticmethod
+    def clear(author, batch_size):
+        posts = Post.objects.filter(author=author)
+        while True:
+            ids = list(posts.values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            Post.objects.filter(pk__in=ids).delete()
+        author.delete()
@@ -0,0 +1,54 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from shared.media_gc import collect_orphans
+
+
+class Command(BaseCommand):
+    help = ("Delete media files that no Post.image, User.image or post image variant refers to "
+            "and that are older than the grace period")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only report what would be deleted")
+        parser.add_argument('--grace-hours', type=float, default=None,
+                            help="Keep unreferenced files younger than this, MEDIA_GC_GRACE_PERIOD by default")
+        parser.add_argument('--max-rate', type=float, default=settings.MEDIA_GC_MAX_DELETES_PER_SECOND,
+                            help="Maximum deletions per second, 0 for no limit")
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help="Referenced names fetched from the database per round trip")
+        parser.add_argument('--progress-every', type=int, default=10_000, help="Report progress every N files")
+        parser.add_argument('--loop', action='store_true', help="Run again every --interval instead of exiting")
+        parser.add_argument('--interval', type=float, default=6.0, help="Hours between runs with --loop")
+
+    def handle(self, *args, **options):
+        grace = timedelta(hours=options['grace_hours']) if options['grace_hours'] is not None else None
+        try:
+            while True:
+                started = time.perf_counter()
+                stats = collect_orphans(
+                    grace=grace,
+                    dry_run=options['dry_run'],
+                    max_rate=options['max_rate'],
+                    chunk_size=options['chunk_size'],
+                    progress=self.report,
+                    progress_every=options['progress_every'],
+                )
+                verb = "would free" if options['dry_run'] else "freed"
+                self.stdout.write(f"done in {time.perf_counter() - started:.1f}s: {stats['orphaned']} orphaned, "
+                                  f"{stats['deleted']} deleted, {verb} {stats['freed_bytes'] / 1024 / 1024:.1f} MiB")
+                connections.close_all()
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'] * 3600)
+        except KeyboardInterrupt:
+            pass
+
+    def report(self, stats):
+        self.stdout.write(
+            f"scanned {stats['scanned']}, referenced {stats['referenced']}, too recent {stats['recent']}, "
+            f"orphaned {stats['orphaned']}, deleted {stats['deleted']}"
+        )
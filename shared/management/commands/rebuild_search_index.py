@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from shared.search import install_sqlite_search
+
+
+class Command(BaseCommand):
+    help = ("Recreate the SQLite FTS5 search tables and triggers from the source tables, e.g. after a migration "
+            "remade posts, comments or users; PostgreSQL indexes are kept up to date by the database")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            self.stdout.write(f"Nothing to do on {connection.vendor}")
+            return
+        with connection.cursor() as cursor:
+            install_sqlite_search(cursor, rebuild=True)
+        self.stdout.write("Search tables rebuilt")
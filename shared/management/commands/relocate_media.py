@@ -0,0 +1,142 @@
+import os
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import models, transaction
+
+from post.image_pipeline import variant_names
+from post.models import Post
+from shared.storage import ContentAddressedStorage, is_content_name
+
+
+class Command(BaseCommand):
+    help = ("Move media files saved before content-addressed storage (flat upload_to directories, client "
+            "filenames) to sharded hash names, merging identical files, and repoint the rows at them")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true', help="Only count the files that would move")
+        parser.add_argument('--keep-originals', action='store_true', help="Leave the old files in place")
+        parser.add_argument('--journal', default=os.path.join(settings.BASE_DIR, 'relocate_media.journal'),
+                            help="Relocated originals not removed yet; an interrupted run's are removed by the next")
+
+    def handle(self, *args, **options):
+        if not isinstance(default_storage, ContentAddressedStorage) and not options['dry_run']:
+            raise CommandError("The default storage is not ContentAddressedStorage")
+        self.options = options
+        self.relocated = {}  # old name -> new name, for files referenced more than once
+        # removed only once every field and variant is relocated, since a later batch or field may still
+        # point at one of them; the journal carries them over to the next run if this one is interrupted
+        self.originals = set()
+        if os.path.exists(options['journal']):
+            with open(options['journal']) as journal:
+                self.originals.update(line.rstrip('\n') for line in journal if line.strip())
+        self.missing = 0
+        self.size = 0
+
+        for model in apps.get_models():
+            for field in model._meta.concrete_fields:
+                if isinstance(field, models.FileField):
+                    self.relocate_field(model, field)
+        self.relocate_variants()
+        if not options['dry_run']:
+            self.remove(self.originals)
+            if os.path.exists(options['journal']):
+                os.remove(options['journal'])
+
+        moved = f"{len(self.relocated)} files ({self.size / 1024 / 1024:.1f} MiB)"
+        if options['dry_run']:
+            self.stdout.write(f"{moved} would move, {self.missing} referenced files missing")
+        else:
+            self.stdout.write(f"{moved} moved into {len(set(self.relocated.values()))} stored files, "
+                              f"{self.missing} referenced files missing")
+
+    def relocate_field(self, model, field):
+        """Relocate one FileField's files in pk batches, one UPDATE per batch."""
+        queryset = model._default_manager.exclude(**{field.attname: ''}).exclude(**{f"{field.attname}__isnull": True})
+        last_pk = None
+        relocated = 0
+        while True:
+            batch = queryset.order_by('pk').only('pk', field.attname)
+            if last_pk is not None:
+                batch = batch.filter(pk__gt=last_pk)
+            rows = list(batch[:self.options['batch_size']])
+            if not rows:
+                self.stdout.write(f"{model._meta.label}.{field.name}: {relocated} rows relocated")
+                return
+            last_pk = rows[-1].pk
+            changed, originals = [], set()
+            for row in rows:
+                name = getattr(row, field.attname).name
+                new_name = self.relocate(name)
+                if new_name is not None:
+                    setattr(row, field.attname, new_name)
+                    changed.append(row)
+                    originals.add(name)
+            if changed and not self.options['dry_run']:
+                with transaction.atomic():
+                    model._default_manager.bulk_update(changed, [field.name])
+                self.record(originals)
+            relocated += len(changed)
+
+    def relocate_variants(self):
+        queryset = Post.objects.exclude(image_variants={})
+        last_pk = None
+        while True:
+            batch = queryset.order_by('pk').only('pk', 'image_variants')
+            if last_pk is not None:
+                batch = batch.filter(pk__gt=last_pk)
+            rows = list(batch[:self.options['batch_size']])
+            if not rows:
+                return
+            last_pk = rows[-1].pk
+            changed, originals = [], set()
+            for post in rows:
+                names = {name: self.relocate(name) for name in variant_names(post.image_variants)}
+                names = {name: new_name for name, new_name in names.items() if new_name is not None}
+                if names:
+                    post.image_variants = {
+                        fmt: {width: names.get(name, name) for width, name in widths.items()}
+                        for fmt, widths in post.image_variants.items()
+                    }
+                    changed.append(post)
+                    originals.update(names)
+            if changed and not self.options['dry_run']:
+                with transaction.atomic():
+                    Post.objects.bulk_update(changed, ['image_variants'])
+                self.record(originals)
+
+    def relocate(self, name):
+        """The content-addressed name for ``name``'s file, or None if it's already one or the file is gone."""
+        if is_content_name(name):
+            return None
+        if name in self.relocated:
+            if not self.options['dry_run']:
+                default_storage.add_reference(self.relocated[name])
+            return self.relocated[name]
+        if not default_storage.exists(name):
+            self.missing += 1
+            return None
+        self.size += default_storage.size(name)
+        if self.options['dry_run']:
+            self.relocated[name] = name
+            return name
+        with default_storage.open(name, 'rb') as file:
+            self.relocated[name] = default_storage.save(name, file)
+        return self.relocated[name]
+
+    def record(self, names):
+        """Note originals whose rows now point at the relocated files."""
+        names = set(names) - self.originals
+        self.originals.update(names)
+        if names:
+            with open(self.options['journal'], 'a') as journal:
+                journal.writelines(f"{name}\n" for name in names)
+
+    def remove(self, names):
+        if self.options['keep_originals']:
+            return
+        for name in names:
+            default_storage.delete(name)
@@ -0,0 +1,60 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections, DatabaseError
+
+from shared.outbox import drain, outbox_stats
+
+
+class Command(BaseCommand):
+    help = "Send queued emails from the outbox in batches over reused mail connections"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--concurrency', type=int, default=2,
+                            help="Number of sender threads, i.e. the maximum number of open SMTP connections")
+        parser.add_argument('--loop', action='store_true', help="Keep polling instead of exiting when the queue is empty")
+        parser.add_argument('--interval', type=float, default=2.0, help="Polling interval in seconds with --loop")
+        parser.add_argument('--stats', action='store_true', help="Only print queue depth and send latency")
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            for key, value in outbox_stats().items():
+                self.stdout.write(f"{key}: {value}")
+            return
+
+        stop_event = threading.Event()
+        totals = [0, 0]
+        lock = threading.Lock()
+
+        def worker():
+            try:
+                while not stop_event.is_set():
+                    try:
+                        sent, failed = drain(options['batch_size'], stop_event)
+                    except DatabaseError as e:
+                        self.stderr.write(f"outbox worker: {e}")
+                        sent, failed = 0, 0
+                    with lock:
+                        totals[0] += sent
+                        totals[1] += failed
+                    if not options['loop']:
+                        break
+                    stop_event.wait(options['interval'])
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(max(1, options['concurrency']))]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(0.5)
+        except KeyboardInterrupt:
+            stop_event.set()
+            for thread in threads:
+                thread.join()
+        self.stdout.write(f"sent {totals[0]}, failed {totals[1]} in {time.perf_counter() - started:.1f}s")
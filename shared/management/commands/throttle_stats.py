@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from shared.throttling import throttle_stats
+
+
+class Command(BaseCommand):
+    help = "Print allowed/rejected counters and rejection rate per throttle rate"
+
+    def handle(self, *args, **options):
+        for name, stats in throttle_stats().items():
+            self.stdout.write(
+                f"{name}: allowed {stats['allowed']}, rejected {stats['rejected']}, "
+                f"rejection rate {stats['rejection_rate']:.1%}"
+            )
@@ -0,0 +1,137 @@
+import heapq
+import os
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connection, models
+from django.db.models.functions import Collate
+from django.utils import timezone
+
+from post.models import Post
+
+# variant names inside Post.image_variants ({"webp": {"320": name, ...}, ...}), in byte order
+VARIANT_NAMES_SQL = {
+    'postgresql': (
+        'SELECT w.value COLLATE "C" AS name FROM {table}, jsonb_each({table}.image_variants) f, '
+        'jsonb_each_text(f.value) w ORDER BY name'
+    ),
+    'sqlite': (
+        "SELECT j.value AS name FROM {table}, json_tree({table}.image_variants) j "
+        "WHERE j.type = 'text' ORDER BY name"
+    ),
+}
+
+
+def byte_order_collation():
+    """The collation that sorts text like Python sorts str, so both sides of the merge agree."""
+    return 'C' if connection.vendor == 'postgresql' else 'BINARY'
+
+
+def file_field_names(model, field, chunk_size):
+    """The names stored in one FileField, sorted, streamed from a server-side cursor."""
+    return (
+        model._default_manager.exclude(**{field.attname: ''}).exclude(**{f"{field.attname}__isnull": True})
+        .annotate(gc_name=Collate(field.attname, byte_order_collation()))
+        .order_by('gc_name').values_list('gc_name', flat=True).iterator(chunk_size=chunk_size)
+    )
+
+
+def variant_names(chunk_size):
+    with connection.chunked_cursor() as cursor:
+        cursor.execute(VARIANT_NAMES_SQL[connection.vendor].format(table=Post._meta.db_table))
+        while rows := cursor.fetchmany(chunk_size):
+            for name, in rows:
+                yield name
+
+
+def referenced_names(chunk_size):
+    """Every media name a row refers to, in byte order; a name used by several rows repeats."""
+    streams = [
+        file_field_names(model, field, chunk_size)
+        for model in apps.get_models()
+        for field in model._meta.concrete_fields
+        if isinstance(field, models.FileField)
+    ]
+    streams.append(variant_names(chunk_size))
+    return heapq.merge(*streams)
+
+
+def media_files(directory, prefix=''):
+    """
+    ``(name, entry)`` for every file under ``directory``, in byte order of the
+    name. Directories sort as ``name/`` so a subtree comes exactly where its
+    paths fall among its siblings; only one directory listing is held at a time.
+    """
+    with os.scandir(directory) as entries:
+        entries = sorted(
+            (entry for entry in entries if not entry.name.startswith('.')),
+            key=lambda entry: entry.name + '/' if entry.is_dir(follow_symlinks=False) else entry.name,
+        )
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            yield from media_files(entry.path, f"{prefix}{entry.name}/")
+        elif entry.is_file(follow_symlinks=False):
+            yield f"{prefix}{entry.name}", entry
+
+
+def collect_orphans(grace=None, dry_run=False, max_rate=None, chunk_size=2000,
+                    progress=None, progress_every=10_000, stop_event=None):
+    """
+    Walk MEDIA_ROOT and delete files no row refers to and that are older than
+    ``grace`` (MEDIA_GC_GRACE_PERIOD), so uploads whose row isn't committed yet
+    survive. The sorted file walk is merged with the sorted stream of
+    referenced names, so neither side is ever loaded whole. ``max_rate`` caps
+    deletions per second; ``progress(stats)`` is called every ``progress_every``
+    files and at the end.
+    """
+    grace = settings.MEDIA_GC_GRACE_PERIOD if grace is None else grace
+    unused_since = timezone.now() - grace
+    cutoff = unused_since.timestamp()
+    purge = getattr(default_storage, 'purge', None)
+    stats = {'scanned': 0, 'referenced': 0, 'recent': 0, 'orphaned': 0, 'deleted': 0, 'freed_bytes': 0}
+
+    root = default_storage.path('')
+    if not os.path.isdir(root):
+        return stats
+
+    references = referenced_names(chunk_size)
+    reference = next(references, None)
+    next_delete = time.monotonic()
+    for name, entry in media_files(root):
+        if stop_event is not None and stop_event.is_set():
+            break
+        stats['scanned'] += 1
+        if progress is not None and stats['scanned'] % progress_every == 0:
+            progress(stats)
+        while reference is not None and reference < name:
+            reference = next(references, None)
+        if reference == name:
+            stats['referenced'] += 1
+            continue
+        stat = entry.stat(follow_symlinks=False)
+        if stat.st_mtime >= cutoff:
+            stats['recent'] += 1
+            continue
+        stats['orphaned'] += 1
+        if dry_run:
+            stats['freed_bytes'] += stat.st_size
+            continue
+
+        if max_rate:
+            next_delete = max(next_delete, time.monotonic())
+            time.sleep(max(0.0, next_delete - time.monotonic()))
+            next_delete += 1 / max_rate
+        if purge is not None:
+            deleted = purge(name, unused_since)
+        else:
+            default_storage.delete(name)
+            deleted = True
+        if deleted:
+            stats['deleted'] += 1
+            stats['freed_bytes'] += stat.st_size
+
+    if progress is not None:
+        progress(stats)
+    return stats
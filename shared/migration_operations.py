@@ -0,0 +1,248 @@
+"""
+Migration helpers for turning the varchar primary keys of BaseModel tables into native
+uuid columns without holding ACCESS EXCLUSIVE locks for the length of a table rewrite.
+
+On PostgreSQL ``convert_uuid_keys`` adds a ``<column>__uuid`` shadow column to every key
+and to every foreign key column that references it, keeps the shadows in step with a
+trigger, fills them in committed batches of primary-key ranges and builds their indexes
+CONCURRENTLY. Only the final swap (drop the old columns, rename the shadows, attach the
+prebuilt indexes as constraints) takes the exclusive locks, and it does no scans: NOT NULL
+is proven by validated CHECK constraints and foreign keys are re-added NOT VALID and
+validated afterwards. A run that was interrupted can simply be started again.
+
+Migrations using it must set ``atomic = False``.
+"""
+import re
+
+from django.db import migrations, transaction
+
+BATCH_SIZE = 5000
+SHADOW_SUFFIX = '__uuid'
+
+
+class AlterFieldExceptPostgres(migrations.AlterField):
+    """AlterField whose schema change is left to ``convert_uuid_keys`` on PostgreSQL."""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            return
+        super(AlterFieldExceptPostgres, self).database_forwards(app_label, schema_editor, from_state, to_state)
+
+
+def shadow(name):
+    return name + SHADOW_SUFFIX
+
+
+def quote(name):
+    return '"%s"' % name.replace('"', '""')
+
+
+def column_type(cursor, table, column):
+    cursor.execute(
+        "SELECT data_type FROM information_schema.columns "
+        "WHERE table_schema = current_schema() AND table_name = %s AND column_name = %s",
+        [table, column]
+    )
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def primary_key_column(cursor, table):
+    cursor.execute(
+        "SELECT a.attname FROM pg_index i "
+        "JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0] "
+        "WHERE i.indrelid = %s::regclass AND i.indisprimary",
+        [table]
+    )
+    return cursor.fetchone()[0]
+
+
+def referencing_foreign_keys(cursor, table, column):
+    """(table, column, constraint name, constraint definition) of every FK pointing at ``table.column``."""
+    cursor.execute(
+        "SELECT c.conrelid::regclass::text, a.attname, c.conname, pg_get_constraintdef(c.oid) "
+        "FROM pg_constraint c "
+        "JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = c.conkey[1] "
+        "JOIN pg_attribute r ON r.attrelid = c.confrelid AND r.attnum = c.confkey[1] "
+        "WHERE c.contype = 'f' AND c.confrelid = %s::regclass AND r.attname = %s",
+        [table, column]
+    )
+    return [(fk_table.strip('"'), fk_column, name, definition) for fk_table, fk_column, name, definition in cursor.fetchall()]
+
+
+def indexes_on(cursor, table, columns):
+    """(index name, definition, constraint type or None) of the indexes of ``table`` using any of ``columns``."""
+    cursor.execute(
+        "SELECT ic.relname, pg_get_indexdef(i.indexrelid), con.contype, "
+        "ARRAY(SELECT a.attname FROM pg_attribute a WHERE a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)) "
+        "FROM pg_index i JOIN pg_class ic ON ic.oid = i.indexrelid "
+        "LEFT JOIN pg_constraint con ON con.conindid = i.indexrelid AND con.conrelid = i.indrelid AND con.contype IN ('p', 'u') "
+        "WHERE i.indrelid = %s::regclass",
+        [table]
+    )
+    return [
+        (name, definition, contype) for name, definition, contype, index_columns in cursor.fetchall()
+        if set(index_columns) & set(columns) and not name.endswith(SHADOW_SUFFIX)
+    ]
+
+
+def not_null(cursor, table, column):
+    cursor.execute(
+        "SELECT attnotnull FROM pg_attribute WHERE attrelid = %s::regclass AND attname = %s", [table, column]
+    )
+    return cursor.fetchone()[0]
+
+
+def shadow_index_name(name):
+    return name[:63 - len(SHADOW_SUFFIX)] + SHADOW_SUFFIX
+
+
+def shadow_index_definition(definition, name, columns):
+    """The same index over the shadow columns, built concurrently under a temporary name."""
+    head, tail = definition.split(' USING ', 1)
+    head = head.replace(f" INDEX {name} ON ", f" INDEX CONCURRENTLY IF NOT EXISTS {shadow_index_name(name)} ON ", 1)
+    head = head.replace(f' INDEX {quote(name)} ON ', f" INDEX CONCURRENTLY IF NOT EXISTS {shadow_index_name(name)} ON ", 1)
+    for column in columns:
+        tail = re.sub(rf'(?<![\w"]){re.escape(column)}(?![\w"])|{re.escape(quote(column))}', quote(shadow(column)), tail)
+    return f"{head} USING {tail}"
+
+
+def plan(cursor, tables):
+    """``{table: [columns to convert]}`` and the foreign keys that point at the converted keys."""
+    columns, foreign_keys = {}, []
+    for table in tables:
+        pk = primary_key_column(cursor, table)
+        if column_type(cursor, table, pk) == 'uuid':
+            continue
+        columns.setdefault(table, []).append(pk)
+        for fk_table, fk_column, name, definition in referencing_foreign_keys(cursor, table, pk):
+            columns.setdefault(fk_table, []).append(fk_column)
+            foreign_keys.append((fk_table, name, definition))
+    return columns, foreign_keys
+
+
+def add_shadow_columns(cursor, table, columns):
+    for column in columns:
+        cursor.execute(f"ALTER TABLE {quote(table)} ADD COLUMN IF NOT EXISTS {quote(shadow(column))} uuid")
+    assignments = ' '.join(f"NEW.{quote(shadow(column))} := NEW.{quote(column)}::uuid;" for column in columns)
+    function = quote(shadow(f"{table}_sync"))
+    cursor.execute(
+        f"CREATE OR REPLACE FUNCTION {function}() RETURNS trigger LANGUAGE plpgsql AS "
+        f"$$ BEGIN {assignments} RETURN NEW; END $$"
+    )
+    cursor.execute(f"DROP TRIGGER IF EXISTS {function} ON {quote(table)}")
+    cursor.execute(
+        f"CREATE TRIGGER {function} BEFORE INSERT OR UPDATE ON {quote(table)} "
+        f"FOR EACH ROW EXECUTE FUNCTION {function}()"
+    )
+
+
+def backfill(cursor, table, columns, batch_size):
+    """Fill the shadow columns one committed primary-key range at a time."""
+    pk = quote(primary_key_column(cursor, table))
+    assignments = ', '.join(f"{quote(shadow(column))} = {quote(column)}::uuid" for column in columns)
+    pending = ' OR '.join(f"({quote(shadow(column))} IS NULL AND {quote(column)} IS NOT NULL)" for column in columns)
+    low = None
+    while True:
+        bound = '' if low is None else f"WHERE {pk} > %s"
+        params = [] if low is None else [low]
+        cursor.execute(f"SELECT {pk} FROM {quote(table)} {bound} ORDER BY {pk} OFFSET %s LIMIT 1", params + [batch_size - 1])
+        row = cursor.fetchone()
+        high = row[0] if row else None
+        conditions = [f"({pending})"]
+        if low is not None:
+            conditions.append(f"{pk} > %s")
+        if high is not None:
+            conditions.append(f"{pk} <= %s")
+        cursor.execute(
+            f"UPDATE {quote(table)} SET {assignments} WHERE {' AND '.join(conditions)}",
+            params + ([high] if high is not None else [])
+        )
+        if high is None:
+            return
+        low = high
+
+
+def build_shadow_indexes(cursor, table, columns):
+    for name, definition, contype in indexes_on(cursor, table, columns):
+        if '_pattern_ops' in definition:
+            continue  # varchar LIKE indexes have no uuid counterpart
+        cursor.execute(
+            "SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(%s)", [shadow_index_name(name)]
+        )
+        row = cursor.fetchone()
+        if row is not None and not row[0]:
+            cursor.execute(f"DROP INDEX CONCURRENTLY {quote(shadow_index_name(name))}")
+        cursor.execute(shadow_index_definition(definition, name, columns))
+
+
+def prove_not_null(cursor, table, columns):
+    """Validated CHECK constraints let the swap's SET NOT NULL skip its table scan."""
+    for column in columns:
+        if not not_null(cursor, table, column):
+            continue
+        check = quote(shadow_index_name(f"{column}_notnull"))
+        cursor.execute(
+            f"ALTER TABLE {quote(table)} DROP CONSTRAINT IF EXISTS {check}, "
+            f"ADD CONSTRAINT {check} CHECK ({quote(shadow(column))} IS NOT NULL) NOT VALID"
+        )
+        cursor.execute(f"ALTER TABLE {quote(table)} VALIDATE CONSTRAINT {check}")
+
+
+def swap(cursor, columns, foreign_keys):
+    tables = list(columns)
+    cursor.execute(f"LOCK TABLE {', '.join(quote(table) for table in tables)} IN ACCESS EXCLUSIVE MODE")
+    indexes = {table: indexes_on(cursor, table, table_columns) for table, table_columns in columns.items()}
+    required = {table: [column for column in table_columns if not_null(cursor, table, column)]
+                for table, table_columns in columns.items()}
+    for fk_table, name, _ in foreign_keys:
+        cursor.execute(f"ALTER TABLE {quote(fk_table)} DROP CONSTRAINT {quote(name)}")
+    for table, table_columns in columns.items():
+        function = quote(shadow(f"{table}_sync"))
+        cursor.execute(f"DROP TRIGGER {function} ON {quote(table)}")
+        cursor.execute(f"DROP FUNCTION {function}()")
+        for column in table_columns:
+            cursor.execute(f"ALTER TABLE {quote(table)} DROP COLUMN {quote(column)}")
+            cursor.execute(f"ALTER TABLE {quote(table)} RENAME COLUMN {quote(shadow(column))} TO {quote(column)}")
+        for column in required[table]:
+            cursor.execute(f"ALTER TABLE {quote(table)} ALTER COLUMN {quote(column)} SET NOT NULL")
+            cursor.execute(
+                f"ALTER TABLE {quote(table)} DROP CONSTRAINT {quote(shadow_index_name(f'{column}_notnull'))}"
+            )
+        for name, definition, contype in indexes[table]:
+            if '_pattern_ops' in definition:
+                continue
+            built = quote(shadow_index_name(name))
+            if contype == 'p':
+                cursor.execute(f"ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(name)} PRIMARY KEY USING INDEX {built}")
+            elif contype == 'u':
+                cursor.execute(f"ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(name)} UNIQUE USING INDEX {built}")
+            else:
+                cursor.execute(f"ALTER INDEX {built} RENAME TO {quote(name)}")
+    for fk_table, name, definition in foreign_keys:
+        cursor.execute(f"ALTER TABLE {quote(fk_table)} ADD CONSTRAINT {quote(name)} {definition} NOT VALID")
+
+
+def convert_uuid_keys(*tables, batch_size=BATCH_SIZE):
+    """RunPython callable converting the primary keys of ``tables`` and every foreign key to them."""
+
+    def forwards(apps, schema_editor):
+        connection = schema_editor.connection
+        if connection.vendor != 'postgresql':
+            return
+        with connection.cursor() as cursor:
+            columns, foreign_keys = plan(cursor, tables)
+            if not columns:
+                return
+            for table, table_columns in columns.items():
+                add_shadow_columns(cursor, table, table_columns)
+            for table, table_columns in columns.items():
+                backfill(cursor, table, table_columns, batch_size)
+                build_shadow_indexes(cursor, table, table_columns)
+                prove_not_null(cursor, table, table_columns)
+            with transaction.atomic(using=connection.alias):
+                swap(cursor, columns, foreign_keys)
+            for fk_table, name, _ in foreign_keys:
+                cursor.execute(f"ALTER TABLE {quote(fk_table)} VALIDATE CONSTRAINT {quote(name)}")
+
+    return forwards
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.1 on 2026-10-18 18:17
+
+import django.utils.timezone
+import shared.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailOutbox',
+            fields=[
+                ('id', models.UUIDField(default=shared.models.uuid7, editable=False, primary_key=True, serialize=False)),
+                ('created_time', models.DateTimeField(auto_now_add=True)),
+                ('updated_time', models.DateTimeField(auto_now=True)),
+                ('subject', models.CharField(max_length=255)),
+                ('body', models.TextField()),
+                ('to_email', models.CharField(max_length=255)),
+                ('content_subtype', models.CharField(default='plain', max_length=10)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('SENT', 'Sent'), ('FAILED', 'Failed')], default='PENDING', max_length=7)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('next_attempt_time', models.DateTimeField(default=django.utils.timezone.now)),
+                ('sent_time', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, default='')),
+            ],
+            options={
+                'db_table': 'email_outbox',
+                'indexes': [models.Index(fields=['status', 'next_attempt_time'], name='outbox_due_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models.functions import Upper
+
+from shared.search import SEARCH_CONFIG, install_sqlite_search, uninstall_sqlite_search
+
+
+def search_indexes(apps):
+    return [
+        (apps.get_model('post', 'Post'),
+         GinIndex(SearchVector('caption', config=SEARCH_CONFIG), name='post_caption_search_idx')),
+        (apps.get_model('post', 'PostComment'),
+         GinIndex(SearchVector('comment', config=SEARCH_CONFIG), name='comment_search_idx')),
+        (apps.get_model('users', 'User'),
+         GinIndex(OpClass(Upper('username'), name='gin_trgm_ops'), name='user_username_trgm_idx')),
+    ]
+
+
+def create_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        for model, index in search_indexes(apps):
+            schema_editor.add_index(model, index)
+    elif vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            install_sqlite_search(cursor)
+
+
+def drop_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        for model, index in search_indexes(apps):
+            schema_editor.remove_index(model, index)
+    elif vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            uninstall_sqlite_search(cursor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shared', '0001_initial'),
+        ('post', '0007_hashtag_hashtagbucket_mention_posthashtag'),
+        ('users', '0009_user_follower_count_user_following_count_follow'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
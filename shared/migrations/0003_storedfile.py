@@ -0,0 +1,29 @@
+# Generated by Django 5.1.1 on 2026-10-18 19:19
+
+import shared.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shared', '0002_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredFile',
+            fields=[
+                ('id', models.UUIDField(default=shared.models.uuid7, editable=False, primary_key=True, serialize=False)),
+                ('created_time', models.DateTimeField(auto_now_add=True)),
+                ('updated_time', models.DateTimeField(auto_now=True)),
+                ('digest', models.CharField(max_length=64, unique=True)),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('size', models.PositiveBigIntegerField()),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'stored_files',
+            },
+        ),
+    ]
@@ -1,12 +1,145 @@
+import copy
+import os
+import threading
+import time
 import uuid
 
 from django.db import models
+from django.utils import timezone
+
+_uuid7_lock = threading.Lock()
+_uuid7_last = [0, 0]  # last unix ms, last 12-bit sequence
+
+
+def uuid7():
+    """
+    Time-ordered UUID (RFC 9562 version 7): 48-bit unix ms timestamp, then a
+    12-bit per-process sequence and 62 random bits. New rows land at the right
+    edge of the primary key B-tree instead of at random pages.
+    """
+    with _uuid7_lock:
+        ms = time.time_ns() // 1_000_000
+        last_ms, last_seq = _uuid7_last
+        if ms <= last_ms:
+            ms, seq = last_ms, last_seq + 1
+            if seq > 0xFFF:
+                ms, seq = ms + 1, 0
+        else:
+            seq = int.from_bytes(os.urandom(2), 'big') & 0x7FF
+        _uuid7_last[:] = ms, seq
+
+    rand_b = int.from_bytes(os.urandom(8), 'big') & ((1 << 62) - 1)
+    value = (ms & ((1 << 48) - 1)) << 80 | 0x7 << 76 | seq << 64 | 0b10 << 62 | rand_b
+    return uuid.UUID(int=value)
 
 
 class BaseModel(models.Model):
-    id = models.URLField(primary_key=True, default=uuid.uuid4, unique=True, editable=False)
+    """
+    Remembers the column values an instance was loaded (or last saved) with. A plain
+    ``save()`` of such an instance writes only the changed columns plus ``auto_now``
+    ones, and is skipped entirely when nothing changed. Because that save is an UPDATE
+    with ``update_fields``, saving an instance whose row was deleted in the meantime
+    raises DatabaseError instead of inserting the row again.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     created_time = models.DateTimeField(auto_now_add=True)
     updated_time = models.DateTimeField(auto_now=True)
 
+    _loaded_values = None
+
     class Meta:
         abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super(BaseModel, cls).from_db(db, field_names, values)
+        instance.remember_loaded_values()
+        return instance
+
+    def save(self, *args, **kwargs):
+        tracked = not args and self._loaded_values is not None and not self._state.adding
+        if tracked and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            dirty = self.get_dirty_fields()
+            if not dirty:
+                return
+            auto_now = {field.name for field in self._meta.concrete_fields if getattr(field, 'auto_now', False)}
+            kwargs['update_fields'] = dirty | auto_now
+        super(BaseModel, self).save(*args, **kwargs)
+        self.remember_loaded_values(kwargs.get('update_fields'))
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super(BaseModel, self).refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        self.remember_loaded_values(fields)
+
+    def remember_loaded_values(self, fields=None):
+        loaded = dict(self._loaded_values or {}) if fields is not None else {}
+        for field in self._meta.concrete_fields:
+            if field.attname not in self.__dict__:  # deferred
+                continue
+            if fields is not None and field.name not in fields and field.attname not in fields:
+                continue
+            value = self.__dict__[field.attname]
+            if isinstance(field, models.FileField):
+                value = getattr(value, 'name', value)
+            elif isinstance(value, (dict, list)):
+                value = copy.deepcopy(value)  # JSONField values can be changed in place
+            loaded[field.attname] = value
+        self._loaded_values = loaded
+
+    def get_dirty_fields(self):
+        """Names of the concrete fields changed since load; every field for a new instance."""
+        if self._state.adding or self._loaded_values is None:
+            return {field.name for field in self._meta.concrete_fields}
+        dirty = set()
+        for field in self._meta.concrete_fields:
+            if field.primary_key or field.attname not in self.__dict__:
+                continue
+            value = self.__dict__[field.attname]
+            if field.attname not in self._loaded_values:
+                dirty.add(field.name)
+            elif isinstance(field, models.FileField):
+                if not getattr(value, '_committed', True) or getattr(value, 'name', value) != self._loaded_values[field.attname]:
+                    dirty.add(field.name)
+            elif value != self._loaded_values[field.attname]:
+                dirty.add(field.name)
+        return dirty
+
+
+class EmailOutbox(BaseModel):
+    class Status(models.TextChoices):
+        PENDING = "PENDING", "Pending"
+        SENT = "SENT", "Sent"
+        FAILED = "FAILED", "Failed"
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    to_email = models.CharField(max_length=255)
+    content_subtype = models.CharField(max_length=10, default='plain')
+    status = models.CharField(max_length=7, choices=Status, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_time = models.DateTimeField(default=timezone.now)
+    sent_time = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+
+    class Meta:
+        db_table = 'email_outbox'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_time'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.to_email}: {self.subject}"
+
+
+class StoredFile(BaseModel):
+    """A content-addressed media file and how many saves refer to it (see shared.storage)."""
+    digest = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'stored_files'
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,126 @@
+import logging
+import statistics
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from shared.models import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+# a claimed message is hidden from other workers for this long; if the worker dies it becomes due again
+CLAIM_LEASE = timedelta(minutes=5)
+
+
+def enqueue_email(subject, body, to_email, content_subtype='plain'):
+    message = EmailOutbox.objects.create(
+        subject=subject,
+        body=body,
+        to_email=to_email,
+        content_subtype=content_subtype,
+    )
+    if settings.EMAIL_OUTBOX_EAGER:
+        transaction.on_commit(lambda: send_batch([message.pk]))
+    return message
+
+
+def claim_batch(batch_size):
+    now = timezone.now()
+    with transaction.atomic():
+        due = (
+            EmailOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status=EmailOutbox.Status.PENDING, next_attempt_time__lte=now)
+            .order_by('next_attempt_time')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        pks = list(due)
+        EmailOutbox.objects.filter(pk__in=pks).update(next_attempt_time=now + CLAIM_LEASE)
+    return pks
+
+
+def send_batch(pks):
+    """Send the given outbox rows over a single mail connection; returns (sent, failed)."""
+    messages = list(EmailOutbox.objects.filter(pk__in=pks, status=EmailOutbox.Status.PENDING))
+    if not messages:
+        return 0, 0
+
+    sent, failed = [], []
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+        for message in messages:
+            email = EmailMessage(subject=message.subject, body=message.body, to=[message.to_email],
+                                 connection=connection)
+            email.content_subtype = message.content_subtype
+            try:
+                email.send()
+                sent.append(message)
+            except Exception as e:
+                message.last_error = repr(e)
+                failed.append(message)
+    except Exception as e:
+        # could not even connect: every message in the batch is retried
+        for message in messages[len(sent) + len(failed):]:
+            message.last_error = repr(e)
+            failed.append(message)
+    finally:
+        connection.close()
+
+    now = timezone.now()
+    EmailOutbox.objects.filter(pk__in=[message.pk for message in sent]).update(
+        status=EmailOutbox.Status.SENT, sent_time=now, last_error=''
+    )
+    for message in failed:
+        message.attempts += 1
+        if message.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+            message.status = EmailOutbox.Status.FAILED
+        message.next_attempt_time = now + backoff(message.attempts)
+    EmailOutbox.objects.bulk_update(failed, ['attempts', 'status', 'next_attempt_time', 'last_error'])
+
+    if sent:
+        latency = [(now - message.created_time).total_seconds() for message in sent]
+        logger.info("outbox: sent %s, failed %s, latency p50 %.2fs max %.2fs",
+                    len(sent), len(failed), statistics.median(latency), max(latency))
+    if failed:
+        logger.warning("outbox: %s messages failed, last error %s", len(failed), failed[-1].last_error)
+    return len(sent), len(failed)
+
+
+def backoff(attempts):
+    seconds = settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** (attempts - 1)
+    return timedelta(seconds=min(seconds, settings.EMAIL_OUTBOX_MAX_RETRY_DELAY))
+
+
+def drain(batch_size=50, stop_event: threading.Event = None):
+    """Send due messages batch by batch until the queue is empty (or stop_event is set)."""
+    total_sent = total_failed = 0
+    while stop_event is None or not stop_event.is_set():
+        pks = claim_batch(batch_size)
+        if not pks:
+            break
+        sent, failed = send_batch(pks)
+        total_sent += sent
+        total_failed += failed
+    return total_sent, total_failed
+
+
+def outbox_stats(window=500):
+    """Queue depth and enqueue-to-send latency over the last ``window`` sent messages."""
+    now = timezone.now()
+    pending = EmailOutbox.objects.filter(status=EmailOutbox.Status.PENDING)
+    oldest = pending.order_by('created_time').values_list('created_time', flat=True).first()
+    recent = EmailOutbox.objects.filter(status=EmailOutbox.Status.SENT).order_by('-sent_time').values_list(
+        'created_time', 'sent_time')[:window]
+    latency = sorted((sent_time - created_time).total_seconds() for created_time, sent_time in recent)
+    return {
+        'pending': pending.count(),
+        'due': pending.filter(next_attempt_time__lte=now).count(),
+        'failed': EmailOutbox.objects.filter(status=EmailOutbox.Status.FAILED).count(),
+        'oldest_pending_age': (now - oldest).total_seconds() if oldest else 0,
+        'latency_p50': latency[len(latency) // 2] if latency else None,
+        'latency_p95': latency[int(len(latency) * 0.95)] if latency else None,
+    }
@@ -0,0 +1,135 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+
+RESULTS = ('hit', 'stale', 'miss')
+
+
+def version_key(name):
+    return f"rc:version:{name}"
+
+
+def get_versions(names):
+    keys = [version_key(name) for name in names]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # start from the clock, not 0, so an evicted counter never maps back onto old entries
+            cache.add(key, time.time_ns() // 1_000_000, None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_versions(names):
+    """Invalidate every cached response that depends on one of ``names``, once the current transaction commits."""
+    names = list(names)
+
+    def bump():
+        for name in names:
+            try:
+                cache.incr(version_key(name))
+            except ValueError:
+                cache.add(version_key(name), time.time_ns() // 1_000_000, None)
+
+    transaction.on_commit(bump)
+
+
+def cached_response(scope, request, version_names, render):
+    """
+    Serve ``render()``'s response from the cache under a key made of the request
+    path and the current versions of ``version_names``. Entries are fresh for
+    RESPONSE_CACHE_TTL seconds. After that, or after a version bump, one request
+    re-renders while concurrent ones get the previous entry (stale-while-revalidate).
+    """
+    digest = hashlib.sha256(f"{request.get_full_path()}|{request.META.get('HTTP_ACCEPT', '')}".encode()).hexdigest()
+    prefix = f"rc:{scope}:{digest[:32]}"
+    key = f"{prefix}:{'.'.join(str(version) for version in get_versions(version_names))}"
+    latest_key = f"{prefix}:latest"
+    values = cache.get_many([key, latest_key])
+    entry = values.get(key)
+    if entry is not None and entry['fresh_until'] > time.time():
+        return from_entry(scope, entry, 'hit')
+
+    lock_key = f"{prefix}:lock"
+    if not cache.add(lock_key, 1, settings.RESPONSE_CACHE_LOCK_TTL):
+        stale = entry if entry is not None else cache.get(values[latest_key]) if latest_key in values else None
+        if stale is not None:
+            return from_entry(scope, stale, 'stale')
+        count(scope, 'miss')
+        return render()
+
+    try:
+        response = render()
+        if hasattr(response, 'render') and not response.is_rendered:
+            response.render()
+        if response.status_code == 200:
+            entry = {
+                'content': response.content,
+                'status': response.status_code,
+                'headers': dict(response.items()),
+                'fresh_until': time.time() + settings.RESPONSE_CACHE_TTL,
+            }
+            timeout = settings.RESPONSE_CACHE_TTL + settings.RESPONSE_CACHE_STALE_TTL
+            cache.set_many({key: entry, latest_key: key}, timeout)
+    finally:
+        cache.delete(lock_key)
+    count(scope, 'miss')
+    response['X-Cache'] = 'MISS'
+    return response
+
+
+def from_entry(scope, entry, result):
+    count(scope, result)
+    response = HttpResponse(entry['content'], status=entry['status'])
+    for header, value in entry['headers'].items():
+        response[header] = value
+    response['X-Cache'] = result.upper()
+    return response
+
+
+class AnonymousResponseCacheMixin:
+    """
+    Cache whole responses of GETs without credentials. Views name a
+    ``response_cache_scope`` and return the version names their payload depends on
+    from ``get_response_versions()``; writes bump those versions.
+    """
+    response_cache_scope = None
+
+    def get_response_versions(self):
+        return []
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method != 'GET' or 'HTTP_AUTHORIZATION' in request.META:
+            return super(AnonymousResponseCacheMixin, self).dispatch(request, *args, **kwargs)
+        self.args, self.kwargs = args, kwargs
+        return cached_response(
+            self.response_cache_scope,
+            request,
+            self.get_response_versions(),
+            lambda: super(AnonymousResponseCacheMixin, self).dispatch(request, *args, **kwargs),
+        )
+
+
+def count(scope, result):
+    key = f"rc:stats:{scope}:{result}"
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def response_cache_stats(scopes):
+    """Hit/stale/miss counters and hit ratio per scope; stale responses count as hits."""
+    values = cache.get_many([f"rc:stats:{scope}:{result}" for scope in scopes for result in RESULTS])
+    stats = {}
+    for scope in scopes:
+        counts = {result: values.get(f"rc:stats:{scope}:{result}", 0) for result in RESULTS}
+        total = sum(counts.values())
+        counts['hit_ratio'] = (counts['hit'] + counts['stale']) / total if total else 0.0
+        stats[scope] = counts
+    return stats
@@ -0,0 +1,167 @@
+import re
+import uuid
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+from django.db import connection
+from django.db.models import Case, When, Value, FloatField, Q
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast, Upper
+
+from post.models import Post, PostComment
+from users.models import User
+
+SEARCH_CONFIG = 'simple'
+TERM_RE = re.compile(r'\w+')
+MAX_TERMS = 8
+
+# SQLite keeps external-content FTS5 tables in step with their source tables through
+# triggers; PostgreSQL maintains its GIN expression indexes itself.
+SQLITE_SEARCH_TABLES = {
+    'post_search': ('posts', 'caption', 'unicode61'),
+    'comment_search': ('post_postcomment', 'comment', 'unicode61'),
+    'user_search': ('users_user', 'username', 'trigram'),
+}
+
+
+def sqlite_search_schema(name, table, column, tokenizer):
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {name} USING fts5("
+        f"{column}, content='{table}', content_rowid='rowid', tokenize='{tokenizer}')",
+        f"CREATE TRIGGER IF NOT EXISTS {name}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {name}(rowid, {column}) VALUES (new.rowid, new.{column}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {name}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {name}({name}, rowid, {column}) VALUES ('delete', old.rowid, old.{column}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {name}_au AFTER UPDATE OF {column} ON {table} BEGIN "
+        f"INSERT INTO {name}({name}, rowid, {column}) VALUES ('delete', old.rowid, old.{column}); "
+        f"INSERT INTO {name}(rowid, {column}) VALUES (new.rowid, new.{column}); END",
+        f"INSERT INTO {name}({name}) VALUES ('rebuild')",
+    ]
+
+
+def install_sqlite_search(cursor, rebuild=False):
+    """
+    Create the FTS5 tables and triggers and fill them from the source tables.
+    ``rebuild`` drops them first, e.g. after a migration remade a source table
+    (which drops its triggers and can renumber its rowids).
+    """
+    if rebuild:
+        uninstall_sqlite_search(cursor)
+    for name, (table, column, tokenizer) in SQLITE_SEARCH_TABLES.items():
+        for statement in sqlite_search_schema(name, table, column, tokenizer):
+            cursor.execute(statement)
+
+
+def uninstall_sqlite_search(cursor):
+    for name in SQLITE_SEARCH_TABLES:
+        for trigger in ('ai', 'ad', 'au'):
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}_{trigger}")
+        cursor.execute(f"DROP TABLE IF EXISTS {name}")
+
+
+def search_terms(text):
+    return TERM_RE.findall((text or '').lower())[:MAX_TERMS]
+
+
+def fts_match(terms):
+    """FTS5 query: every term, the last one as a prefix (the user may still be typing it)."""
+    return ' '.join([f'"{term}"' for term in terms[:-1]] + [f'"{terms[-1]}"*'])
+
+
+def sqlite_matches(model, fts_table, condition, params):
+    table = model._meta.db_table
+    pk = model._meta.pk.column
+    return RawSQL(f"SELECT {pk} FROM {table} WHERE rowid IN (SELECT rowid FROM {fts_table} WHERE {condition})", params)
+
+
+def sqlite_search(queryset, fts_table, match):
+    """
+    Join the FTS5 table on rowid so the match and its bm25 ``rank`` (lower is better)
+    come from a single full-text cursor, instead of re-running the match per row.
+    """
+    table = queryset.model._meta.db_table
+    return queryset.extra(
+        tables=[fts_table], where=[f"{fts_table} MATCH %s", f"{fts_table}.rowid = {table}.rowid"], params=[match]
+    ).annotate(rank=RawSQL(f"-{fts_table}.rank", (), output_field=FloatField()))
+
+
+def search_text(model, field, fts_table, text):
+    terms = search_terms(text)
+    if not terms:
+        return model.objects.none()
+    if connection.vendor == 'postgresql':
+        query = SearchQuery(
+            ' & '.join(terms[:-1] + [f"{terms[-1]}:*"]), config=SEARCH_CONFIG, search_type='raw'
+        )
+        # the same expression as the GIN index, so the match is an index scan
+        vector = SearchVector(field, config=SEARCH_CONFIG)
+        # ts_rank is float4, which reaches Python rounded; as float8 the cursor round-trips exactly
+        rank = Cast(SearchRank(vector, query), FloatField())
+        return model.objects.annotate(search=vector, rank=rank).filter(search=query)
+    return sqlite_search(model.objects.all(), fts_table, fts_match(terms))
+
+
+def search_posts(text):
+    """Posts whose caption matches every word of ``text``, annotated with a ``rank``, higher is better."""
+    return search_text(Post, 'caption', 'post_search', text)
+
+
+def search_comments(text):
+    return search_text(PostComment, 'comment', 'comment_search', text)
+
+
+def search_users(text):
+    """
+    Active users by username: exact match first, then prefix matches, then
+    similar names, all served by the trigram index on upper(username).
+    """
+    text = (text or '').strip().lstrip('@')
+    if not text:
+        return User.objects.none()
+    needle = text.upper()
+    queryset = User.objects.filter(is_active=True).annotate(username_upper=Upper('username'))
+    exact = Case(
+        When(username_upper=needle, then=Value(2.0)),
+        When(username_upper__startswith=needle, then=Value(1.0)),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+    if connection.vendor == 'postgresql':
+        return queryset.filter(
+            Q(username_upper__startswith=needle) | Q(username_upper__trigram_similar=needle)
+        ).annotate(rank=exact + TrigramSimilarity('username_upper', needle))
+    if len(text) >= 3:
+        # the trigram tokenizer matches any substring of three or more characters
+        condition, params = "user_search MATCH %s", ('"' + text.replace('"', '""') + '"',)
+    else:
+        condition, params = "username LIKE %s ESCAPE '\\'", (re.sub(r'([\\%_])', r'\\\1', text) + '%',)
+    return queryset.filter(pk__in=sqlite_matches(User, 'user_search', condition, params)).annotate(rank=exact)
+
+
+SEARCH_TYPES = {
+    'posts': search_posts,
+    'comments': search_comments,
+    'users': search_users,
+}
+
+
+class TextSearchAdminMixin:
+    """
+    Admin search through the text index instead of ``icontains`` over every search
+    field. Rows whose id or one of ``exact_search_fields`` equals the term are
+    found as well, each through its own index.
+    """
+    search_type = None
+    exact_search_fields = ()
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        condition = Q(pk__in=SEARCH_TYPES[self.search_type](search_term).values('pk'))
+        try:
+            condition |= Q(pk=uuid.UUID(search_term))
+        except ValueError:
+            pass
+        for field in self.exact_search_fields:
+            condition |= Q(**{field: search_term})
+        return queryset.filter(condition), False
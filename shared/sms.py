@@ -0,0 +1,159 @@
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass
+
+from decouple import config
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SmsMessage:
+    to: str
+    body: str
+
+
+class BaseSmsTransport:
+    def send_messages(self, messages):
+        """Send a batch of SmsMessage; returns how many were sent."""
+        raise NotImplementedError
+
+
+class TwilioSmsTransport(BaseSmsTransport):
+    """One long-lived Twilio client per process; its HTTP session keeps the connection alive."""
+
+    def __init__(self):
+        from twilio.http.http_client import TwilioHttpClient
+        from twilio.rest import Client
+
+        self.client = Client(
+            config('account_sig'),
+            config("auth_token"),
+            http_client=TwilioHttpClient(pool_connections=True, timeout=10),
+        )
+        self.from_number = settings.SMS_FROM_NUMBER
+
+    def send_messages(self, messages):
+        sent = 0
+        for message in messages:
+            try:
+                self.client.messages.create(body=message.body, from_=self.from_number, to=message.to)
+                sent += 1
+            except Exception:
+                logger.exception("SMS to %s failed", message.to)
+        return sent
+
+
+class ConsoleSmsTransport(BaseSmsTransport):
+    def send_messages(self, messages):
+        for message in messages:
+            print(f"SMS to {message.to}: {message.body}")
+        return len(messages)
+
+
+class LocmemSmsTransport(BaseSmsTransport):
+    """In-process fake for tests and offline load tests; ``latency`` simulates the provider round trip."""
+    outbox = []
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    def send_messages(self, messages):
+        if self.latency:
+            time.sleep(self.latency)
+        LocmemSmsTransport.outbox.extend(messages)
+        return len(messages)
+
+
+class SmsDispatcher:
+    """
+    Bounded queue drained by a few background threads. Each wake-up takes up to
+    ``batch_size`` queued messages, so bursts go out in batches over the transport's
+    reused connection instead of one request-thread round trip per SMS.
+    """
+
+    def __init__(self, transport: BaseSmsTransport, workers=2, queue_size=1000, batch_size=20):
+        self.transport = transport
+        self.workers = workers
+        self.batch_size = batch_size
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.sent = 0
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def send(self, to, body):
+        message = SmsMessage(to=str(to), body=body)
+        if self.workers <= 0:
+            self.send_inline(message)
+            return
+        self.start()
+        try:
+            self.queue.put(message, timeout=settings.SMS_ENQUEUE_TIMEOUT)
+        except queue.Full:
+            # back-pressure instead of losing the code
+            logger.warning("SMS queue is full, sending to %s inline", message.to)
+            self.send_inline(message)
+
+    def send_inline(self, message):
+        sent = self.transport.send_messages([message])
+        with self._lock:
+            self.sent += sent
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self.run, name=f"sms-dispatcher-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                sent = self.transport.send_messages(batch)
+                with self._lock:
+                    self.sent += sent
+            except Exception:
+                logger.exception("SMS batch of %s failed", len(batch))
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def join(self):
+        """Wait until every queued message has been handed to the transport."""
+        self.queue.join()
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_sms_dispatcher() -> SmsDispatcher:
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            transport = import_string(settings.SMS_TRANSPORT)()
+            _dispatcher = SmsDispatcher(
+                transport,
+                workers=settings.SMS_DISPATCH_WORKERS,
+                queue_size=settings.SMS_QUEUE_SIZE,
+                batch_size=settings.SMS_BATCH_SIZE,
+            )
+        return _dispatcher
+
+
+def send_sms(to, body):
+    """Queue an SMS once the current transaction commits."""
+    transaction.on_commit(lambda: get_sms_dispatcher().send(to, body))
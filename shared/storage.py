@@ -0,0 +1,129 @@
+import hashlib
+import os
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import transaction, IntegrityError
+from django.db.models import F
+from django.utils import timezone
+
+from shared.models import StoredFile
+
+CONTENT_NAME_RE = re.compile(r'^[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(\.\w+)?$')
+
+
+def content_name(digest, extension):
+    extension = extension.lower()
+    if not re.fullmatch(r'\.\w{1,10}', extension):
+        extension = ''
+    return f"{digest[:2]}/{digest[2:4]}/{digest}{extension}"
+
+
+def is_content_name(name):
+    return bool(name) and CONTENT_NAME_RE.match(name) is not None
+
+
+def hash_content(content):
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in content.chunks():
+        digest.update(chunk)
+        size += len(chunk)
+    return digest.hexdigest(), size
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Names every file by the SHA-256 of its bytes, sharded as ``ab/cd/abcd….ext``
+    so no directory holds more than 256 entries per level, and stores identical
+    bytes once. The directory and the client's filename given to ``save()`` are
+    dropped; only the extension is kept.
+
+    StoredFile rows count references: ``save()`` adds one and ``delete()`` drops
+    one, removing the file with the last. Names that aren't content-addressed
+    (files from before this storage) are deleted directly.
+    """
+
+    def __init__(self, **kwargs):
+        # identical bytes under an identical name: rewriting a file is harmless
+        kwargs.setdefault('allow_overwrite', True)
+        super(ContentAddressedStorage, self).__init__(**kwargs)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        digest, size = hash_content(content)
+        with transaction.atomic():
+            # the row lock keeps a concurrent delete() of the same bytes from removing the file under us
+            stored = StoredFile.objects.select_for_update().filter(digest=digest).first()
+            if stored is not None:
+                StoredFile.objects.filter(pk=stored.pk).update(
+                    ref_count=F('ref_count') + 1, updated_time=timezone.now()
+                )
+                if self.exists(stored.name):
+                    # a fresh mtime keeps the garbage collector's grace period from covering a reused file
+                    os.utime(self.path(stored.name))
+                else:
+                    self._save(stored.name, content)
+                return stored.name
+
+            name = content_name(digest, os.path.splitext(name)[1])
+            self._save(name, content)
+            try:
+                with transaction.atomic():
+                    StoredFile.objects.create(digest=digest, name=name, size=size, ref_count=1)
+            except IntegrityError:
+                # the same bytes were saved concurrently, possibly with another extension
+                StoredFile.objects.filter(digest=digest).update(ref_count=F('ref_count') + 1)
+                stored_name = StoredFile.objects.filter(digest=digest).values_list('name', flat=True).get()
+                if stored_name != name:
+                    super(ContentAddressedStorage, self).delete(name)
+                return stored_name
+        return name
+
+    def add_reference(self, name):
+        """Count one more reference to an already stored file, as a save() of the same bytes would."""
+        updated = StoredFile.objects.filter(name=name).update(ref_count=F('ref_count') + 1, updated_time=timezone.now())
+        return updated > 0
+
+    def delete(self, name):
+        if not is_content_name(name):
+            return super(ContentAddressedStorage, self).delete(name)
+        with transaction.atomic():
+            stored = StoredFile.objects.select_for_update().filter(name=name).first()
+            if stored is None:
+                return super(ContentAddressedStorage, self).delete(name)
+            if stored.ref_count > 1:
+                StoredFile.objects.filter(pk=stored.pk).update(ref_count=F('ref_count') - 1)
+                return
+            stored.delete()
+            super(ContentAddressedStorage, self).delete(name)
+
+    def purge(self, name, unused_since=None):
+        """
+        Remove a file nothing refers to, whatever its reference count says. A file
+        saved again after ``unused_since`` is kept. Returns whether it was removed.
+        """
+        with transaction.atomic():
+            stored = StoredFile.objects.select_for_update().filter(name=name).first()
+            if stored is not None:
+                if unused_since is not None and stored.updated_time >= unused_since:
+                    return False
+                stored.delete()
+            super(ContentAddressedStorage, self).delete(name)
+        return True
+
+
+def release_files(names):
+    """Drop the storage references of files a row stopped using, once the transaction commits."""
+    names = [name for name in names if name]
+
+    def release():
+        for name in names:
+            default_storage.delete(name)
+
+    if names:
+        transaction.on_commit(release)
@@ -1,3 +1,153 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib import admin
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from post.admin import PostModelAdmin
+from post.models import Post
+from shared.management.commands import relocate_media
+from shared.media_gc import collect_orphans
+from shared.models import StoredFile
+from shared.storage import ContentAddressedStorage, is_content_name
+from users.models import User
+
+
+class MediaTestCase(TestCase):
+    """Runs with MEDIA_ROOT in a temporary directory."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.author = User.objects.create(username='author', email='author@example.com')
+
+    def files(self):
+        return sorted(
+            os.path.relpath(os.path.join(path, name), self.media_root)
+            for path, _, names in os.walk(self.media_root) for name in names
+        )
+
+
+class ContentAddressedStorageTest(MediaTestCase):
+
+    def test_same_bytes_are_stored_once(self):
+        name = default_storage.save('posts/a.jpg', ContentFile(b'image bytes'))
+        self.assertEqual(default_storage.save('other/b.JPG', ContentFile(b'image bytes')), name)
+        self.assertTrue(is_content_name(name))
+        self.assertEqual(self.files(), [name])
+        self.assertEqual(StoredFile.objects.get(name=name).ref_count, 2)
+
+    def test_last_delete_removes_the_file(self):
+        name = default_storage.save('posts/a.jpg', ContentFile(b'image bytes'))
+        default_storage.save('posts/b.jpg', ContentFile(b'image bytes'))
+        default_storage.delete(name)
+        self.assertTrue(default_storage.exists(name))
+        self.assertEqual(StoredFile.objects.get(name=name).ref_count, 1)
+        default_storage.delete(name)
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(StoredFile.objects.filter(name=name).exists())
+
+    def test_relocate_removes_originals_once_everything_moved(self):
+        self.assertIsInstance(default_storage, ContentAddressedStorage)
+        os.makedirs(os.path.join(self.media_root, 'posts'))
+        with open(os.path.join(self.media_root, 'posts', 'old.jpg'), 'wb') as file:
+            file.write(b'old image bytes')
+        posts = [Post.objects.create(author=self.author, image='posts/old.jpg', caption='old') for _ in range(3)]
+
+        journal = os.path.join(tempfile.mkdtemp(), 'relocate_media.journal')
+        self.addCleanup(shutil.rmtree, os.path.dirname(journal))
+        with mock.patch.object(relocate_media.Command, 'relocate_variants', side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                call_command('relocate_media', batch_size=1, journal=journal, stdout=StringIO())
+        # the interrupted run left the original to the next one
+        self.assertIn('posts/old.jpg', self.files())
+        call_command('relocate_media', batch_size=1, journal=journal, stdout=StringIO())
+        self.assertFalse(os.path.exists(journal))
+
+        names = {post.image.name for post in Post.objects.filter(pk__in=[post.pk for post in posts])}
+        self.assertEqual(len(names), 1)
+        name = names.pop()
+        self.assertTrue(is_content_name(name))
+        self.assertEqual(self.files(), [name])
+        self.assertEqual(StoredFile.objects.get(name=name).ref_count, 3)
+
+
+class CollectOrphansTest(MediaTestCase):
+
+    def setUp(self):
+        super(CollectOrphansTest, self).setUp()
+        image = default_storage.save('posts/a.jpg', ContentFile(b'image'))
+        variant = default_storage.save('posts/a.webp', ContentFile(b'variant'))
+        Post.objects.create(author=self.author, image=image, caption='caption',
+                            image_variants={'webp': {'320': variant}})
+        self.orphan = default_storage.save('posts/b.jpg', ContentFile(b'orphan'))
+        self.legacy_orphan = 'posts/legacy.jpg'
+        default_storage._save(self.legacy_orphan, ContentFile(b'legacy orphan'))
+        self.recent = default_storage.save('posts/c.jpg', ContentFile(b'recent'))
+        self.referenced = [image, variant]
+
+        old = time.time() - settings.MEDIA_GC_GRACE_PERIOD.total_seconds() - 3600
+        for name in (image, variant, self.orphan, self.legacy_orphan):
+            os.utime(default_storage.path(name), (old, old))
+        StoredFile.objects.exclude(name=self.recent).update(
+            updated_time=timezone.now() - settings.MEDIA_GC_GRACE_PERIOD - timedelta(hours=1)
+        )
+
+    def test_only_old_unreferenced_files_are_deleted(self):
+        stats = collect_orphans()
+        self.assertEqual(self.files(), sorted(self.referenced + [self.recent]))
+        self.assertEqual((stats['referenced'], stats['recent'], stats['deleted']), (2, 1, 2))
+        self.assertFalse(StoredFile.objects.filter(name=self.orphan).exists())
+
+    def test_dry_run_deletes_nothing(self):
+        before = self.files()
+        stats = collect_orphans(dry_run=True)
+        self.assertEqual(self.files(), before)
+        self.assertEqual((stats['orphaned'], stats['deleted']), (2, 0))
+        self.assertTrue(StoredFile.objects.filter(name=self.orphan).exists())
+
+
+class SearchTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create(username='author', email='author@example.com')
+
+    def create_post(self, caption):
+        return Post.objects.create(author=self.author, image='posts/a.jpg', caption=caption)
+
+    def test_rank_cursor_pages_through_tied_ranks(self):
+        posts = [self.create_post('the same words') for _ in range(5)]
+        self.create_post('other words')
+        url, seen = '/search/?q=same&page_size=2', []
+        while url:
+            data = self.client.get(url).json()
+            seen += [item['id'] for item in data['result']]
+            url = data['next']
+        self.assertEqual(seen, [str(post.pk) for post in sorted(posts, key=lambda post: post.pk, reverse=True)])
+
+    def test_admin_search_by_caption_id_and_username(self):
+        post, other = self.create_post('sunset at the beach'), self.create_post('morning')
+        model_admin = PostModelAdmin(Post, admin.site)
+
+        def search(term):
+            queryset, _ = model_admin.get_search_results(None, Post.objects.all(), term)
+            return set(queryset)
+
+        self.assertEqual(search('sunset'), {post})
+        self.assertEqual(search(str(other.pk)), {other})
+        self.assertEqual(search('author'), {post, other})
@@ -0,0 +1,140 @@
+import hashlib
+import math
+import time
+
+from django.core.cache import cache
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 60 * 60 * 24}
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Token bucket as GCRA: the whole bucket state is one "theoretical arrival time"
+    per key in the shared cache, so a check is one cache read plus one write and
+    never touches the database. Rates come from DEFAULT_THROTTLE_RATES under
+    ``<view.throttle_scope>_<kind>``, e.g. ``"login_ip": "30/min"`` is a bucket of
+    30 tokens refilled over a minute. Like DRF's own throttles the read-modify-write
+    is not atomic, so concurrent requests may overshoot a limit by a few.
+    """
+    kind = None
+    cache = cache
+
+    def allow_request(self, request, view):
+        self.wait_seconds = None
+        scope = getattr(view, 'throttle_scope', None)
+        rate_name = f"{scope}_{self.kind}"
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(rate_name) if scope else None
+        ident = self.get_throttle_ident(request, view) if rate else None
+        if ident is None:
+            return True
+
+        capacity, period = self.parse_rate(rate)
+        interval = period / capacity
+        key = f"throttle:{rate_name}:{ident}"
+        now = time.time()
+        tat = max(self.cache.get(key, now), now)
+        allow_at = tat + interval - capacity * interval
+        if now < allow_at:
+            self.wait_seconds = allow_at - now
+            count_throttle(rate_name, rejected=True)
+            return False
+        self.cache.set(key, tat + interval, math.ceil(tat + interval - now))
+        count_throttle(rate_name, rejected=False)
+        return True
+
+    def wait(self):
+        return self.wait_seconds
+
+    @staticmethod
+    def parse_rate(rate):
+        num, period = rate.split('/')
+        return int(num), DURATIONS[period[0]]
+
+    def get_throttle_ident(self, request, view):
+        raise NotImplementedError
+
+
+class IPTokenBucketThrottle(TokenBucketThrottle):
+    kind = 'ip'
+
+    def get_throttle_ident(self, request, view):
+        return self.get_ident(request)
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """Keyed by the access token's user_id claim, read without loading the user."""
+    kind = 'user'
+
+    def get_throttle_ident(self, request, view):
+        authentication = JWTAuthentication()
+        header = authentication.get_header(request)
+        raw_token = authentication.get_raw_token(header) if header else None
+        if raw_token is None:
+            return None
+        try:
+            return str(authentication.get_validated_token(raw_token)['user_id'])
+        except (InvalidToken, TokenError, AuthenticationFailed, KeyError):
+            return None
+
+
+class TargetTokenBucketThrottle(TokenBucketThrottle):
+    """Keyed by the email/phone/username in ``view.throttle_target_field`` of the request body."""
+    kind = 'target'
+
+    def get_throttle_ident(self, request, view):
+        field = getattr(view, 'throttle_target_field', None)
+        value = request.data.get(field) if field and hasattr(request.data, 'get') else None
+        if not value:
+            return None
+        return hashlib.sha256(str(value).strip().lower().encode()).hexdigest()[:32]
+
+
+class ThrottleBeforeAuthMixin:
+    """
+    DRF authenticates (one DB query for the user) before it checks throttles.
+    Check them first so that a rejected request costs only cache lookups.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        self.check_throttles(request)
+        self.throttles_checked = True
+        super(ThrottleBeforeAuthMixin, self).initial(request, *args, **kwargs)
+
+    def check_throttles(self, request):
+        if not getattr(self, 'throttles_checked', False):
+            super(ThrottleBeforeAuthMixin, self).check_throttles(request)
+
+
+AUTH_THROTTLE_CLASSES = (IPTokenBucketThrottle, UserTokenBucketThrottle, TargetTokenBucketThrottle)
+
+
+def count_throttle(rate_name, rejected):
+    key = f"throttle:stats:{rate_name}:{'rejected' if rejected else 'allowed'}"
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def throttle_stats():
+    """Allowed/rejected counters per configured rate, e.g. ``login_ip``."""
+    rate_names = sorted(api_settings.DEFAULT_THROTTLE_RATES)
+    keys = [f"throttle:stats:{name}:{result}" for name in rate_names for result in ('allowed', 'rejected')]
+    values = cache.get_many(keys)
+    stats = {}
+    for name in rate_names:
+        allowed = values.get(f"throttle:stats:{name}:allowed", 0)
+        rejected = values.get(f"throttle:stats:{name}:rejected", 0)
+        total = allowed + rejected
+        stats[name] = {
+            'allowed': allowed,
+            'rejected': rejected,
+            'rejection_rate': rejected / total if total else 0.0,
+        }
+    return stats
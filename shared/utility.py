@@ -1,12 +1,10 @@
 import re
-import threading
 
 import phonenumbers
-from decouple import config
-from django.core.mail import EmailMessage
 from django.template.loader import render_to_string
 from rest_framework.exceptions import ValidationError
-from twilio.rest import Client
+
+from shared.sms import send_sms
 
 email_regex = re.compile(
     r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
@@ -54,27 +52,18 @@ def check_email_or_phone_number(email_or_phone):
     return email_or_phone
 
 
-class EmailTread(threading.Thread):
-
-    def __init__(self, email):
-        self.email = email
-        threading.Thread.__init__(self)
-
-    def run(self):
-        self.email.send()
-
-
 class Email:
     @staticmethod
     def send_email(data):  # ToDo staticmethod ni o'rganish
-        email = EmailMessage(
+        # xabar outbox jadvaliga yoziladi, send_outbox worker uni yuboradi
+        from shared.outbox import enqueue_email
+
+        enqueue_email(
             subject=data['subject'],
             body=data['body'],
-            to=[data['to_email']],
+            to_email=data['to_email'],
+            content_subtype='html' if data.get('content_type') == 'html' else 'plain',
         )
-        if data.get('content-type') == 'html':
-            email.content_subtype = 'html'
-        EmailTread(email).start()  # ToDo thread larni o'rganish
 
 
 def send_email(email, code):
@@ -93,11 +82,4 @@ def send_email(email, code):
 
 
 def send_phone_code(phone, code):
-    account_sid = config('account_sig')
-    auth_token = config("auth_token")
-    client = Client(account_sid, auth_token)
-    client.messages.create(
-        body=f"Salom, sizning tasdiqlash kodingiz {code}",
-        from_="+998907205768",
-        to=f"{phone}",
-    )
+    send_sms(phone, f"Salom, sizning tasdiqlash kodingiz {code}")
@@ -1,3 +1,37 @@
-from django.shortcuts import render
+from rest_framework import permissions
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import ListAPIView
 
-# Create your views here.
+from post.serializers import PostSerializer, CommentSearchSerializer, UserSerializer
+from shared.custom_pagination import RankCursorPagination
+from shared.search import SEARCH_TYPES
+
+SEARCH_SERIALIZERS = {
+    'posts': PostSerializer,
+    'comments': CommentSearchSerializer,
+    'users': UserSerializer,
+}
+
+
+class SearchAPIView(ListAPIView):
+    """``?q=`` over post captions, comments or usernames (``?type=``), best matches first."""
+    permission_classes = (permissions.AllowAny,)
+    pagination_class = RankCursorPagination
+
+    def get_search_type(self):
+        search_type = self.request.query_params.get('type', 'posts')
+        if search_type not in SEARCH_TYPES:
+            raise ValidationError({"message": f"type {', '.join(SEARCH_TYPES)} dan biri bo'lishi kerak"})
+        return search_type
+
+    def get_serializer_class(self):
+        return SEARCH_SERIALIZERS[self.get_search_type()]
+
+    def get_queryset(self):
+        search_type = self.get_search_type()
+        queryset = SEARCH_TYPES[search_type](self.request.query_params.get('q', ''))
+        if search_type == 'posts':
+            return queryset.feed(self.request.user)
+        if search_type == 'comments':
+            return queryset.select_related('author')
+        return queryset
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from users.models import User, UserConfirmation
+from users.models import User, UserConfirmation, Follow
 
 
 @admin.register(User)
@@ -10,4 +10,10 @@ class UserModelAdmin(admin.ModelAdmin):
 
 @admin.register(UserConfirmation)
 class UserConfirmationModelAdmin(admin.ModelAdmin):
-    list_display = 'id', 'user', 'code', 'verify_type', 'expiration_time', 'is_confirmed'
+    list_display = 'id', 'user', 'verify_type', 'expiration_time', 'is_confirmed', 'attempts'
+
+
+@admin.register(Follow)
+class FollowModelAdmin(admin.ModelAdmin):
+    list_display = 'id', 'follower', 'followee', 'created_time'
+    search_fields = 'follower__username', 'followee__username'
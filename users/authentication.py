@@ -0,0 +1,131 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from users.models import User
+
+_local_users = OrderedDict()  # user_id -> (expires, pickled user), per process
+_local_lock = threading.Lock()
+
+
+def user_cache_key(user_id):
+    return f"auth:user:{user_id}"
+
+
+def dump_user(user):
+    """
+    Pickle ``user`` for the caches without its password hash: ``password`` is left
+    deferred (read from the database only if a request uses it) and only the MD5 the
+    CHECK_REVOKE_TOKEN comparison needs is kept, as ``password_md5``.
+    """
+    user.password_md5 = get_md5_hash_password(user.password)
+    del user.__dict__['password']
+    user._loaded_values.pop('password', None)
+    return pickle.dumps(user)
+
+
+def get_cached_user(user_id):
+    """
+    Per-process LRU first, then the shared cache, then the database. Entries are
+    pickled so every request gets its own User instance to mutate.
+    """
+    data = get_local(user_id)
+    if data is None:
+        data = cache.get(user_cache_key(user_id))
+        if data is None:
+            user = User.objects.filter(pk=user_id).first()
+            if user is None:
+                return None
+            data = dump_user(user)
+            cache.set(user_cache_key(user_id), data, settings.AUTH_USER_CACHE_TTL)
+        put_local(user_id, data)
+    return pickle.loads(data)
+
+
+async def aget_cached_user(user_id):
+    data = get_local(user_id)
+    if data is None:
+        data = await cache.aget(user_cache_key(user_id))
+        if data is None:
+            user = await User.objects.filter(pk=user_id).afirst()
+            if user is None:
+                return None
+            data = dump_user(user)
+            await cache.aset(user_cache_key(user_id), data, settings.AUTH_USER_CACHE_TTL)
+        put_local(user_id, data)
+    return pickle.loads(data)
+
+
+def get_local(user_id):
+    key = str(user_id)
+    with _local_lock:
+        entry = _local_users.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        _local_users.move_to_end(key)
+        return entry[1]
+
+
+def put_local(user_id, data):
+    key = str(user_id)
+    with _local_lock:
+        _local_users[key] = (time.monotonic() + settings.AUTH_USER_CACHE_LOCAL_TTL, data)
+        _local_users.move_to_end(key)
+        while len(_local_users) > settings.AUTH_USER_CACHE_LOCAL_SIZE:
+            _local_users.popitem(last=False)
+
+
+def invalidate_cached_user(user_id):
+    # other processes keep their local copy for at most AUTH_USER_CACHE_LOCAL_TTL seconds
+    with _local_lock:
+        _local_users.pop(str(user_id), None)
+    cache.delete(user_cache_key(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that resolves the user from the cache instead of a query per request."""
+
+    def get_user(self, validated_token):
+        return self.check_user(get_cached_user(self.get_user_id(validated_token)), validated_token)
+
+    async def aauthenticate(self, request):
+        """authenticate() for async views: the token checks are CPU only, the user comes from the async cache/ORM."""
+        header = self.get_header(request)
+        raw_token = self.get_raw_token(header) if header is not None else None
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        user = await aget_cached_user(self.get_user_id(validated_token))
+        return self.check_user(user, validated_token), validated_token
+
+    @staticmethod
+    def get_user_id(validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+    @staticmethod
+    def check_user(user, validated_token):
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            password_md5 = getattr(user, 'password_md5', None) or get_md5_hash_password(user.password)
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != password_md5:
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
@@ -0,0 +1,92 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+GENERATION_KEY = "token_blacklist:generation"
+
+
+class RevokedTokens:
+    """
+    This worker's copy of the revoked (and not yet expired) refresh-token JTIs.
+    Every blacklist() bumps a generation counter in the shared cache; a check
+    compares it with the generation the set was loaded at and only then pulls the
+    rows blacklisted since, so a token that was never revoked costs one cache read.
+    The whole set is rebuilt every TOKEN_BLACKLIST_REBUILD_INTERVAL seconds to drop
+    expired JTIs. The counter is only seen by every worker because settings refuse a
+    per-process cache outside DEBUG.
+    """
+
+    def __init__(self):
+        self.jtis = frozenset()
+        self.generation = None
+        self.loaded_at = None
+        self.rebuilt_at = 0.0
+        self._lock = threading.Lock()
+
+    def __contains__(self, jti):
+        self.refresh()
+        return jti in self.jtis
+
+    def refresh(self):
+        generation = cache.get(GENERATION_KEY, 0)
+        stale = time.monotonic() - self.rebuilt_at > settings.TOKEN_BLACKLIST_REBUILD_INTERVAL
+        if not stale and generation == self.generation:
+            return
+        with self._lock:
+            if stale or self.loaded_at is None:
+                self.rebuild(generation)
+            elif generation != self.generation:
+                self.load_since(generation)
+
+    def rebuild(self, generation):
+        now = timezone.now()
+        self.jtis = frozenset(
+            BlacklistedToken.objects.filter(token__expires_at__gt=now).values_list('token__jti', flat=True)
+        )
+        self.generation, self.loaded_at, self.rebuilt_at = generation, now, time.monotonic()
+
+    def load_since(self, generation):
+        now = timezone.now()
+        # a little overlap so rows committed while the last load ran are not missed
+        since = self.loaded_at - settings.TOKEN_BLACKLIST_CLOCK_SKEW
+        new = BlacklistedToken.objects.filter(blacklisted_at__gte=since).values_list('token__jti', flat=True)
+        self.jtis = self.jtis | frozenset(new)
+        self.generation, self.loaded_at = generation, now
+
+    def add(self, jti):
+        with self._lock:
+            self.jtis = self.jtis | {jti}
+        transaction.on_commit(self.bump_generation)
+
+    @staticmethod
+    def bump_generation():
+        if not cache.add(GENERATION_KEY, 1, None):
+            try:
+                cache.incr(GENERATION_KEY)
+            except ValueError:
+                cache.set(GENERATION_KEY, 1, None)
+
+
+revoked_tokens = RevokedTokens()
+
+
+class CachedBlacklistRefreshToken(RefreshToken):
+    """RefreshToken whose blacklist check reads ``revoked_tokens`` instead of querying BlacklistedToken."""
+
+    def check_blacklist(self):
+        if self.payload[api_settings.JTI_CLAIM] in revoked_tokens:
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        result = super(CachedBlacklistRefreshToken, self).blacklist()
+        revoked_tokens.add(self.payload[api_settings.JTI_CLAIM])
+        return result
@@ -0,0 +1,42 @@
+from django.db import transaction, IntegrityError
+from django.db.models import F
+from rest_framework.exceptions import NotFound
+
+from users.models import User, Follow
+
+
+def change_follow_counters(follower_id, followee_id, delta):
+    """``following_count`` of the follower and ``follower_count`` of the followee, updated in the database."""
+    updated = User.objects.filter(pk=followee_id).update(follower_count=F('follower_count') + delta)
+    User.objects.filter(pk=follower_id).update(following_count=F('following_count') + delta)
+    return updated
+
+
+def follow(follower, followee_id):
+    """
+    Insert the edge unless it already exists. A concurrent duplicate insert hits the
+    unique constraint inside a savepoint and is treated as "already following".
+    Returns the new Follow, or None if nothing changed.
+    """
+    try:
+        with transaction.atomic():
+            edge = Follow.objects.create(follower=follower, followee_id=followee_id)
+    except IntegrityError:
+        return None
+    if not change_follow_counters(follower.pk, followee_id, 1):
+        raise NotFound("User not found")
+    return edge
+
+
+def unfollow(follower, followee_id):
+    deleted, _ = Follow.objects.filter(follower=follower, followee_id=followee_id).delete()
+    if deleted:
+        change_follow_counters(follower.pk, followee_id, -deleted)
+    return bool(deleted)
+
+
+def toggle_follow(follower, followee_id):
+    """Delete-or-insert in one transaction; returns ``(follow, following)``."""
+    if unfollow(follower, followee_id):
+        return None, False
+    return follow(follower, followee_id), True
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users import tokens
+from users.models import User
+from users.tokens import IssuanceStats, OutstandingTokenWriter
+
+
+class Command(BaseCommand):
+    help = "Issue token pairs for an existing user and report signing and outstanding-token insert latency"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tokens', type=int, default=2000)
+        parser.add_argument('--batch-size', type=int, default=200,
+                            help="Outstanding-token rows per INSERT; 1 writes every row on its own")
+        parser.add_argument('--user', help="Username to issue tokens for, the first user by default")
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('date_joined')
+        user = users.filter(username=options['user']).first() if options['user'] else users.first()
+        if user is None:
+            raise CommandError("No user to issue tokens for")
+
+        tokens.stats = IssuanceStats(window=options['tokens'])
+        tokens.writer = OutstandingTokenWriter(batch_size=options['batch_size'], flush_interval=60)
+        started = time.perf_counter()
+        for _ in range(options['tokens']):
+            tokens.issue_tokens(user)
+        signed = time.perf_counter() - started
+        tokens.writer.flush()
+        elapsed = time.perf_counter() - started
+
+        summary = tokens.stats.summary()
+        self.stdout.write(
+            f"{tokens.writer.written} pairs in {elapsed:.2f}s ({tokens.writer.written / elapsed:.0f}/s), "
+            f"signing {signed:.2f}s"
+        )
+        for name in ('sign', 'insert'):
+            self.stdout.write(f"{name}: p50 {summary[name]['p50']:.3f}ms p95 {summary[name]['p95']:.3f}ms")
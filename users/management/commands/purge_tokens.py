@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken, BlacklistedToken
+
+
+class Command(BaseCommand):
+    help = "Delete expired outstanding and blacklisted refresh tokens in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--retention-hours', type=int, default=0,
+                            help="Keep expired tokens this long before deleting them")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['retention_hours'])
+        outstanding = blacklisted = 0
+        while True:
+            batch = list(
+                OutstandingToken.objects.filter(expires_at__lt=cutoff)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:options['batch_size']]
+            )
+            if not batch:
+                break
+            _, deleted = OutstandingToken.objects.filter(pk__in=batch).delete()
+            outstanding += deleted.get(OutstandingToken._meta.label, 0)
+            blacklisted += deleted.get(BlacklistedToken._meta.label, 0)
+        self.stdout.write(f"{outstanding} expired outstanding tokens and {blacklisted} blacklisted tokens deleted")
@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from users.models import UserConfirmation
+
+
+class Command(BaseCommand):
+    help = "Delete expired UserConfirmation rows in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--retention-hours', type=int, default=24,
+                            help="Keep expired rows this long for audit before deleting them")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['retention_hours'])
+        deleted = 0
+        while True:
+            batch = list(
+                UserConfirmation.objects.filter(expiration_time__lt=cutoff)
+                .order_by('expiration_time')
+                .values_list('pk', flat=True)[:options['batch_size']]
+            )
+            if not batch:
+                break
+            deleted += UserConfirmation.objects.filter(pk__in=batch).delete()[0]
+        self.stdout.write(f"{deleted} expired verification codes deleted")
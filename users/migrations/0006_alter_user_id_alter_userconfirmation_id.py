@@ -0,0 +1,39 @@
+# Generated by Django 5.1.1 on 2026-10-18 18:13
+"""
+On PostgreSQL the keys are converted online by ``convert_uuid_keys``: uuid shadow columns
+on users_user, users_userconfirmation and every column referencing users_user.id (posts,
+comments, likes, confirmations, admin log, auth tokens, outstanding JWTs, group/permission
+links) are backfilled in batches of primary-key ranges, then swapped in under a short lock.
+The AlterFields only update the migration state there.
+"""
+
+import shared.models
+from django.db import migrations, models
+
+from shared.migration_operations import AlterFieldExceptPostgres, convert_uuid_keys
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    # every FK to users.User must be in the migration state so its column type is altered together with the PK
+    dependencies = [
+        ('users', '0005_remove_user_gender'),
+        ('admin', '0003_logentry_add_action_flag_choices'),
+        ('authtoken', '0004_alter_tokenproxy_options'),
+        ('token_blacklist', '0012_alter_outstandingtoken_user'),
+    ]
+
+    operations = [
+        AlterFieldExceptPostgres(
+            model_name='user',
+            name='id',
+            field=models.UUIDField(default=shared.models.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+        AlterFieldExceptPostgres(
+            model_name='userconfirmation',
+            name='id',
+            field=models.UUIDField(default=shared.models.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.RunPython(convert_uuid_keys('users_user', 'users_userconfirmation'), migrations.RunPython.noop),
+    ]
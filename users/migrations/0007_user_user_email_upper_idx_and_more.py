@@ -0,0 +1,31 @@
+# Generated by Django 5.1.1 on 2026-10-18 18:15
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0006_alter_user_id_alter_userconfirmation_id'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(django.db.models.functions.text.Upper('email'), name='user_email_upper_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(django.db.models.functions.text.Upper('username'), name='user_username_upper_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['phone_number'], name='user_phone_number_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userconfirmation',
+            index=models.Index(fields=['user', 'is_confirmed', 'expiration_time'], name='confirmation_user_active_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.1 on 2026-10-18 18:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_user_user_email_upper_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='userconfirmation',
+            name='confirmation_user_active_idx',
+        ),
+        migrations.AddIndex(
+            model_name='userconfirmation',
+            index=models.Index(fields=['expiration_time'], name='confirmation_expiration_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.1 on 2026-10-18 19:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0009_user_follower_count_user_following_count_follow'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userconfirmation',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='userconfirmation',
+            index=models.Index(fields=['user', '-created_time'], name='confirmation_user_time_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 19:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0010_userconfirmation_attempts'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='userconfirmation',
+            name='code',
+            field=models.CharField(max_length=64),
+        ),
+    ]
@@ -1,14 +1,14 @@
-import random
 import uuid
-from datetime import datetime, timedelta
+from datetime import timedelta
 
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import FileExtensionValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Upper
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
-from rest_framework_simplejwt.tokens import RefreshToken
 
-from shared.models import BaseModel
+from shared.models import BaseModel, uuid7
 
 
 class User(AbstractUser, BaseModel):
@@ -41,26 +41,30 @@ class User(AbstractUser, BaseModel):
                                   allowed_extensions=['jpeg', 'jpg', 'png', 'heic', 'heif']
                               )]
                               )
+    follower_count = models.PositiveIntegerField(default=0, editable=False)
+    following_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(Upper('email'), name='user_email_upper_idx'),
+            models.Index(Upper('username'), name='user_username_upper_idx'),
+            models.Index(fields=['phone_number'], name='user_phone_number_idx'),
+        ]
 
     def __str__(self):
         return self.username
 
     def create_verify_type(self, verify_type):
-        code = "".join([str(random.randint(0, 100) % 10) for _ in range(4)])
-        UserConfirmation.objects.create(
-            user_id=self.pk,
-            verify_type=verify_type,
-            code=code
-        )
-        return code
+        from users.otp import issue_code
+
+        return issue_code(self, verify_type)
 
     def check_username(self):
         if not self.username:
-            temp_username = f"instagram-{uuid.uuid4().__str__().split('-')[-1]}"
-            while User.objects.filter(username=temp_username).exists():  # ToDo exists ning vazifasini tekshir
-                temp_username = f"{temp_username}{random.randint(0, 9)}"
-
-            self.username = temp_username
+            # primary key unique bo'lgani uchun undan yasalgan nom ham unique, bazani tekshirish shart emas
+            if self.pk is None:
+                self.pk = uuid7()
+            self.username = f"instagram-{self.pk.hex}"
 
     def check_email(self):
         if self.email:
@@ -77,22 +81,38 @@ class User(AbstractUser, BaseModel):
             self.set_password(self.password)
 
     def token(self):
-        refresh = RefreshToken.for_user(self)  # ToDo
-        return {
-            'access': str(refresh.access_token),
-            'refresh_token': str(refresh)
-        }
+        from users.tokens import issue_tokens
+
+        return issue_tokens(self)
 
     def clean(self):
-        self.check_email()
-        self.check_pass()
-        self.check_username()
-        self.hashing_password()
+        # only the fields that changed since the user was loaded need normalizing
+        changed = self.get_dirty_fields()
+        if 'email' in changed:
+            self.check_email()
+        if 'password' in changed:
+            self.check_pass()
+            self.hashing_password()
+        if 'username' in changed:
+            self.check_username()
 
     def save(self, *args, **kwargs):
-        # if not self.pk:
         self.clean()
         super(User, self).save(*args, **kwargs)
+        self.invalidate_auth_cache()
+
+    def delete(self, *args, **kwargs):
+        result = super(User, self).delete(*args, **kwargs)
+        self.invalidate_auth_cache()
+        return result
+
+    def invalidate_auth_cache(self):
+        from users.authentication import invalidate_cached_user
+
+        pk = self.pk
+        invalidate_cached_user(pk)
+        # a request that re-caches the old row before commit would otherwise keep it until the TTL
+        transaction.on_commit(lambda: invalidate_cached_user(pk))
 
 
 EXPIRE_EMAIL = 5
@@ -104,11 +124,18 @@ class UserConfirmation(BaseModel):
         VIA_EMAIL = "VIA_EMAIL", _("Via email")
         VIA_PHONE = "VIA_PHONE", _("Via phone")
 
-    code = models.CharField(max_length=4)
+    code = models.CharField(max_length=64)  # HMAC of the code, see users.otp
     user = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name='verify_codes')
     verify_type = models.CharField(max_length=9, choices=VerifyType)
     expiration_time = models.DateTimeField(null=True)
     is_confirmed = models.BooleanField(default=False)
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['expiration_time'], name='confirmation_expiration_idx'),
+            models.Index(fields=['user', '-created_time'], name='confirmation_user_time_idx'),
+        ]
 
     def __str__(self):
         return str(self.user.__str__())
@@ -116,8 +143,26 @@ class UserConfirmation(BaseModel):
     def save(self, *args, **kwargs):
         # TODO shu funksiyani tekshir
         if self.verify_type == self.VerifyType.VIA_EMAIL:
-            self.expiration_time = datetime.now() + timedelta(minutes=EXPIRE_EMAIL)
+            self.expiration_time = timezone.now() + timedelta(minutes=EXPIRE_EMAIL)
         else:
-            self.expiration_time = datetime.now() + timedelta(minutes=EXPIRE_PHONE)
+            self.expiration_time = timezone.now() + timedelta(minutes=EXPIRE_PHONE)
 
         super(UserConfirmation, self).save(*args, **kwargs)
+
+
+class Follow(BaseModel):
+    follower = models.ForeignKey(User, on_delete=models.CASCADE, related_name='following')
+    followee = models.ForeignKey(User, on_delete=models.CASCADE, related_name='followers')
+
+    class Meta:
+        constraints = [
+            # also the index for "who does this user follow"
+            models.UniqueConstraint(fields=('follower', 'followee'), name='unique_follower_followee'),
+            models.CheckConstraint(condition=~models.Q(follower=models.F('followee')), name='follow_not_self'),
+        ]
+        indexes = [
+            models.Index(fields=['followee', 'follower'], name='follow_followee_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.follower} -> {self.followee}"
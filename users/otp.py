@@ -0,0 +1,107 @@
+import hashlib
+import hmac
+import secrets
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+
+VALID = 'valid'
+INVALID = 'invalid'
+LOCKED = 'locked'
+
+
+def code_key(user):
+    return f"otp:{user.pk}"
+
+
+def code_digest(user, confirmation_id, code):
+    message = f"{user.pk}:{confirmation_id}:{code}".encode()
+    return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+
+def get_active_entry(user):
+    entry = cache.get(code_key(user))
+    if entry is None or entry['expires'] <= time.time():
+        return None
+    return entry
+
+
+def get_active_confirmation(user):
+    """The user's latest UserConfirmation, if it is still usable."""
+    from users.models import UserConfirmation
+
+    confirmation = UserConfirmation.objects.filter(user_id=user.pk).order_by('-created_time').first()
+    if confirmation is None or confirmation.is_confirmed or confirmation.expiration_time <= timezone.now():
+        return None
+    return confirmation
+
+
+def issue_code(user, verify_type):
+    """
+    Store a fresh 4-digit code for ``user`` as an HMAC, in a UserConfirmation row and in
+    the cache until it expires. The cache entry saves reading the row on a check; the
+    row stays the source of truth for attempts and for whether the code was consumed.
+    """
+    from users.models import UserConfirmation, EXPIRE_EMAIL, EXPIRE_PHONE
+
+    code = f"{secrets.randbelow(10_000):04d}"
+    minutes = EXPIRE_EMAIL if verify_type == UserConfirmation.VerifyType.VIA_EMAIL else EXPIRE_PHONE
+    ttl = timedelta(minutes=minutes).total_seconds()
+    confirmation = UserConfirmation(user_id=user.pk, verify_type=verify_type)
+    confirmation.code = code_digest(user, confirmation.pk, code)
+    confirmation.save()
+    entry = {
+        'digest': confirmation.code,
+        'verify_type': verify_type,
+        'expires': time.time() + ttl,
+        'confirmation_id': str(confirmation.pk),
+    }
+    cache.set(code_key(user), entry, ttl)
+    return code
+
+
+def has_active_code(user):
+    """An unexpired code that is neither consumed nor locked by too many attempts."""
+    confirmation = get_active_confirmation(user)
+    return confirmation is not None and confirmation.attempts < settings.OTP_MAX_ATTEMPTS
+
+
+def consume_code(user, code):
+    """
+    Check ``code`` and consume it at most once. Every check counts towards
+    OTP_MAX_ATTEMPTS for the current code; both the attempt and the consumption are
+    conditional UPDATEs of the UserConfirmation row, so two concurrent requests can't
+    both consume the same code. The digest comes from the cache, or from the row when
+    the entry is missing (evicted, or the cache was flushed).
+    """
+    from users.models import UserConfirmation
+
+    entry = get_active_entry(user)
+    if entry is None:
+        confirmation = get_active_confirmation(user)
+        if confirmation is None:
+            return INVALID
+        entry = {'digest': confirmation.code, 'confirmation_id': str(confirmation.pk)}
+    if not code:
+        return INVALID
+    counted = UserConfirmation.objects.filter(
+        pk=entry['confirmation_id'], attempts__lt=settings.OTP_MAX_ATTEMPTS
+    ).update(attempts=F('attempts') + 1)
+    if not counted:
+        return LOCKED
+    if not hmac.compare_digest(entry['digest'], code_digest(user, entry['confirmation_id'], str(code))):
+        return INVALID
+    if not confirm(entry['confirmation_id']):
+        return INVALID
+    cache.delete(code_key(user))
+    return VALID
+
+
+def confirm(confirmation_id):
+    from users.models import UserConfirmation
+
+    return UserConfirmation.objects.filter(pk=confirmation_id, is_confirmed=False).update(is_confirmed=True)
@@ -1,4 +1,5 @@
-from django.contrib.auth import authenticate
+from django.contrib.auth import authenticate, user_login_failed
+from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth.models import update_last_login
 from django.contrib.auth.password_validation import validate_password
 from django.core.validators import FileExtensionValidator
@@ -9,7 +10,9 @@ from rest_framework.generics import get_object_or_404
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
 from rest_framework_simplejwt.tokens import AccessToken
 
-from shared.utility import check_email_or_phone_number, send_email, check_user_type
+from shared.storage import release_files
+from shared.utility import check_email_or_phone_number, send_email, check_user_type, send_phone_code
+from users.blacklist import CachedBlacklistRefreshToken
 from users.models import User
 
 
@@ -43,7 +46,7 @@ class SignUpSerializer(serializers.ModelSerializer):
             send_email(user.email, code)
         elif user.auth_type == User.AuthType.VIA_PHONE:
             code = user.create_verify_type(User.AuthType.VIA_PHONE)
-            send_email(user.phone_number, code)
+            send_phone_code(user.phone_number, code)
         else:
             raise ValidationError(
                 {
@@ -159,7 +162,6 @@ class ChangeUserInfoSerializer(serializers.Serializer):
             'first_name', instance.first_name)
         instance.last_name = validated_data.get(
             'last_name', instance.last_name)
-        instance.password = validated_data.get('password', instance.password)
         instance.username = validated_data.get('username', instance.username)
 
         if validated_data.get('password'):
@@ -181,10 +183,13 @@ class ChangeUserPhotoSerializer(serializers.Serializer):
 
     def update(self, instance: User, validated_data):
         image = validated_data.get("image")
+        replaced = instance.image.name if instance.image else None
         if image is not None:
             instance.image = validated_data.get("image", instance.image)
             instance.auth_status = User.AuthStatus.PHOTO_DONE
         instance.save()
+        if image is not None:
+            release_files([replaced])
         return instance
 
 
@@ -197,48 +202,44 @@ class LoginSerializer(TokenObtainPairSerializer):
 
     def auth_validate(self, data):
         user_input = data.get('user_input')  # email, phone, username
-        auth_type = check_user_type(user_input)
-        if auth_type == 'username':
-            username = user_input
-        elif auth_type == 'email':
-            user = self.get_user(email__iexact=user_input)
-            username = user.username
-        elif auth_type == 'phone':
-            user = self.get_user(phone_number=user_input)
-            username = user.username
-        else:
+        user = self.resolve_user(user_input, data['password'])
+        if user is None:
             raise ValidationError(
                 {
                     "success": False,
-                    'message': "Email, username yoki nomer kiritishingiz kerak"
+                    "message": "Sorry, login or username you entered is incorrect. Please check and try again"
                 }
             )
-        authentication_kwargs = {
-            self.username_field: username,
-            'password': data['password'],
-        }
-        # user statusini tekshiramiz
-
-        current_user = User.objects.filter(username__iexact=username).first()
-        if current_user is not None and current_user.auth_status in [User.AuthStatus.NEW, User.AuthStatus.VERIFY_CODE]:
+        # user statusini faqat parol to'g'ri bo'lganda aytamiz
+        if user.auth_status in [User.AuthStatus.NEW, User.AuthStatus.VERIFY_CODE]:
             raise ValidationError(
                 {
                     "Success": False,
                     "message": "Siz ro'yhatdan to'liq o'tmagansiz"
                 }
             )
-
-        user = authenticate(**authentication_kwargs)
-
-        if user is not None:
-            self.user = user
-        else:
-            raise ValidationError(
-                {
-                    "success": False,
-                    "message": "Sorry, login or username you entered is incorrect. Please check and try again"
-                }
-            )
+        self.user = user
+
+    def resolve_user(self, user_input, password):
+        """
+        Usernames go through authenticate(), matched exactly as ModelBackend does. An email
+        or phone is resolved to the user row with one indexed lookup (the oldest account
+        if an email matches several) and checked here the way ModelBackend would: a miss
+        still costs one password hash, so response time doesn't reveal which accounts
+        exist, and user_login_failed is sent for every failure.
+        """
+        request = self.context.get('request')
+        auth_type = check_user_type(user_input)
+        if auth_type not in ('email', 'phone'):
+            return authenticate(request, **{self.username_field: user_input, 'password': password})
+        lookup = {'email__iexact': user_input} if auth_type == 'email' else {'phone_number': user_input}
+        user = User.objects.filter(**lookup).order_by('created_time', 'pk').first()
+        if user is None:
+            User().set_password(password)
+        elif user.check_password(password) and ModelBackend().user_can_authenticate(user):
+            return user
+        user_login_failed.send(sender=__name__, credentials={self.username_field: user_input}, request=request)
+        return None
 
     def validate(self, data):
         self.auth_validate(data)
@@ -251,18 +252,9 @@ class LoginSerializer(TokenObtainPairSerializer):
         data['full_name '] = self.user.get_full_name()
         return data
 
-    def get_user(self, **kwargs):
-        users = User.objects.filter(**kwargs)
-        if not users.exists():
-            raise ValidationError(
-                {
-                    "No active account found"
-                }
-            )
-        return users.first()
-
 
 class LoginRefreshSerializer(TokenRefreshSerializer):
+    token_class = CachedBlacklistRefreshToken
 
     def validate(self, attrs):
         data = super(LoginRefreshSerializer, self).validate(attrs)
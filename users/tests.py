@@ -1,3 +1,211 @@
-from django.test import TestCase
+import re
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import user_login_failed
+from django.core.cache import cache
+from django.db import DatabaseError, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings, tag
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from shared import sms
+from shared.sms import SmsDispatcher, LocmemSmsTransport
+from users import authentication, tokens
+from users.models import User, UserConfirmation
+from users.serializers import SignUpSerializer
+
+
+class QueryCountTest(TestCase):
+    """
+    Query budgets of the auth flows. Every test starts with empty caches, so a JWT
+    request pays for one user lookup; the outstanding-token row, SMS and eager email
+    are on_commit work and never run inside a TestCase.
+    """
+
+    def setUp(self):
+        cache.clear()
+        authentication._local_users.clear()
+        self.client = APIClient()
+
+    def create_user(self, auth_status=User.AuthStatus.DONE, **kwargs):
+        kwargs.setdefault('username', 'tester')
+        kwargs.setdefault('email', 'tester@example.com')
+        user = User(auth_type=User.AuthType.VIA_EMAIL, auth_status=auth_status, **kwargs)
+        user.set_password('secret-pass-123')
+        user.save()
+        return user
+
+    def authenticate(self, user):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {user.token()['access']}")
+
+    def test_signup(self):
+        # email and phone uniqueness checks, user insert, confirmation insert
+        with self.assertNumQueries(4):
+            response = self.client.post('/users/signup/', {'email_phone_number': '+998901234567'})
+        self.assertEqual(response.status_code, 201)
+
+    def test_verify(self):
+        user = self.create_user(auth_status=User.AuthStatus.NEW)
+        code = user.create_verify_type(UserConfirmation.VerifyType.VIA_EMAIL)
+        self.authenticate(user)
+        # user lookup, attempt counted, confirmation marked used, auth_status update
+        with self.assertNumQueries(4):
+            response = self.client.post('/users/verify/', {'code': code})
+        self.assertEqual(response.status_code, 200)
+
+    def test_verify_without_cache_entry(self):
+        user = self.create_user(auth_status=User.AuthStatus.NEW)
+        code = user.create_verify_type(UserConfirmation.VerifyType.VIA_EMAIL)
+        self.authenticate(user)
+        cache.clear()
+        # user lookup, latest confirmation, attempt counted, confirmation marked used, auth_status update
+        with self.assertNumQueries(5):
+            response = self.client.post('/users/verify/', {'code': code})
+        self.assertEqual(response.status_code, 200)
+
+    def test_login(self):
+        self.create_user()
+        # user lookup by username
+        with self.assertNumQueries(1):
+            response = self.client.post('/users/login/', {'user_input': 'tester', 'password': 'secret-pass-123'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_login_by_email(self):
+        self.create_user()
+        # user lookup by email
+        with self.assertNumQueries(1):
+            response = self.client.post(
+                '/users/login/', {'user_input': 'tester@example.com', 'password': 'secret-pass-123'}
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def test_login_by_email_wrong_password(self):
+        self.create_user()
+        failed = mock.Mock()
+        user_login_failed.connect(failed)
+        self.addCleanup(user_login_failed.disconnect, failed)
+        with self.assertNumQueries(1):
+            response = self.client.post('/users/login/', {'user_input': 'tester@example.com', 'password': 'wrong-pass'})
+        self.assertEqual(response.status_code, 400)
+        failed.assert_called_once()
+
+    def test_change_user(self):
+        user = self.create_user(auth_status=User.AuthStatus.VERIFY_CODE)
+        self.authenticate(user)
+        data = {
+            'first_name': 'Firstname',
+            'last_name': 'Lastname',
+            'username': 'new_username',
+            'password': 'new-secret-456',
+            'confirm_password': 'new-secret-456',
+        }
+        # user lookup, one UPDATE of the changed columns
+        with self.assertNumQueries(2):
+            response = self.client.put('/users/change-user/', data)
+        self.assertEqual(response.status_code, 200)
+
+
+class CachedUserTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        authentication._local_users.clear()
+        self.user = User(username='tester', email='tester@example.com')
+        self.user.set_password('secret-pass-123')
+        self.user.save()
+
+    def test_password_hash_is_not_cached(self):
+        authentication.get_cached_user(self.user.pk)
+        self.assertNotIn(self.user.password.encode(), cache.get(authentication.user_cache_key(self.user.pk)))
+        cached = authentication.get_cached_user(self.user.pk)
+        self.assertEqual(cached.get_deferred_fields(), {'password'})
+        with self.assertNumQueries(1):
+            self.assertTrue(cached.check_password('secret-pass-123'))
+
+
+class DirtySaveTest(TestCase):
+
+    def setUp(self):
+        User.objects.create(username='tester', email='tester@example.com', first_name='First')
+        self.user = User.objects.get(username='tester')
+
+    def test_unchanged_save_issues_no_queries(self):
+        with self.assertNumQueries(0):
+            self.user.save()
+
+    def test_save_writes_only_dirty_columns(self):
+        self.user.first_name = 'Changed'
+        with CaptureQueriesContext(connection) as context:
+            self.user.save()
+        self.assertEqual(len(context.captured_queries), 1)
+        sql = context.captured_queries[0]['sql']
+        self.assertTrue(sql.startswith('UPDATE'))
+        set_clause = sql.split(' SET ', 1)[1].split(' WHERE ', 1)[0]
+        self.assertEqual(set(re.findall(r'"(\w+)" =', set_clause)), {'first_name', 'updated_time'})
+
+    def test_saved_values_become_clean(self):
+        self.user.first_name = 'Changed'
+        self.user.save()
+        with self.assertNumQueries(0):
+            self.user.save()
+
+    def test_refreshed_values_become_clean(self):
+        User.objects.filter(pk=self.user.pk).update(first_name='Elsewhere')
+        self.user.refresh_from_db()
+        with self.assertNumQueries(0):
+            self.user.save()
+        self.user.first_name = 'First'
+        self.assertEqual(self.user.get_dirty_fields(), {'first_name'})
+
+    def test_save_of_deleted_row_raises(self):
+        User.objects.filter(pk=self.user.pk).delete()
+        self.user.first_name = 'Changed'
+        with self.assertRaises(DatabaseError), transaction.atomic():
+            self.user.save()
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+
+
+@tag('slow')
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class SignupStressTest(TransactionTestCase):
+    """
+    Parallel phone signups through SignUpSerializer, each thread on its own connection.
+    Commits really happen here, so codes go to the in-process SMS fake and
+    outstanding tokens are written inline. Run with ``manage.py test --tag slow``.
+    """
+    signups = 3000
+    threads = 16
+    # email and phone uniqueness checks, user insert, confirmation insert, as in
+    # QueryCountTest.test_signup; the outstanding token goes through tokens.writer
+    max_queries = 4
+
+    def setUp(self):
+        self.dispatcher = sms._dispatcher
+        sms._dispatcher = SmsDispatcher(LocmemSmsTransport(), workers=0)
+
+    def tearDown(self):
+        sms._dispatcher = self.dispatcher
+
+    @staticmethod
+    def signup(number):
+        try:
+            with CaptureQueriesContext(connection) as context:
+                serializer = SignUpSerializer(data={'email_phone_number': number})
+                serializer.is_valid(raise_exception=True)
+                serializer.save()
+            return None, len(context.captured_queries)
+        except Exception as e:
+            return repr(e), None
+        finally:
+            connection.close()
+
+    def test_generated_usernames_do_not_collide(self):
+        numbers = [f"+99890{i:07d}" for i in range(self.signups)]
+        with mock.patch.object(tokens.writer, 'flush_interval', 0), ThreadPoolExecutor(self.threads) as executor:
+            results = list(executor.map(self.signup, numbers))
+        self.assertEqual([error for error, _ in results if error], [])
+        self.assertLessEqual(max(queries for _, queries in results), self.max_queries)
+        usernames = list(User.objects.values_list('username', flat=True))
+        self.assertEqual(len(usernames), self.signups)
+        self.assertEqual(len(set(usernames)), self.signups)
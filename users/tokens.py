@@ -0,0 +1,135 @@
+import logging
+import statistics
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.db import transaction, connection
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+from rest_framework_simplejwt.utils import datetime_from_epoch, get_md5_hash_password
+
+from users.blacklist import CachedBlacklistRefreshToken
+
+logger = logging.getLogger(__name__)
+
+
+class IssuanceStats:
+    """Recent signing and outstanding-token insert timings of this process, in milliseconds."""
+
+    def __init__(self, window=1000):
+        self.sign = deque(maxlen=window)
+        self.insert = deque(maxlen=window)  # per row, a batch's time divided by its size
+
+    def summary(self):
+        return {name: self.percentiles(samples) for name, samples in (('sign', self.sign), ('insert', self.insert))}
+
+    @staticmethod
+    def percentiles(samples):
+        samples = sorted(samples)
+        if not samples:
+            return {'count': 0, 'p50': None, 'p95': None}
+        return {
+            'count': len(samples),
+            'p50': statistics.median(samples),
+            'p95': samples[int(len(samples) * 0.95)],
+        }
+
+
+class OutstandingTokenWriter:
+    """
+    Collects the OutstandingToken rows of issued refresh tokens and writes them
+    with one bulk INSERT per batch from a background thread, instead of one
+    INSERT inside every login. A row that is lost with the process only matters
+    for blacklisting, and blacklist() creates the missing row itself.
+    """
+
+    def __init__(self, batch_size=200, flush_interval=1.0):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.rows = []
+        self.written = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def add(self, row):
+        if self.flush_interval <= 0:
+            self.write([row])
+            return
+        with self._lock:
+            self.rows.append(row)
+            full = len(self.rows) >= self.batch_size
+            if self._thread is None:
+                self._thread = threading.Thread(target=self.run, name="outstanding-token-writer", daemon=True)
+                self._thread.start()
+        if full:
+            self._wake.set()
+
+    def run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Writing outstanding tokens failed")
+            finally:
+                connection.close()
+
+    def flush(self):
+        """Write everything queued so far; returns once a concurrent flush has finished too."""
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    rows, self.rows = self.rows[:self.batch_size], self.rows[self.batch_size:]
+                if not rows:
+                    return
+                self.write(rows)
+
+    def write(self, rows):
+        started = time.perf_counter()
+        OutstandingToken.objects.bulk_create(rows, ignore_conflicts=True)
+        elapsed = (time.perf_counter() - started) * 1000
+        stats.insert.extend([elapsed / len(rows)] * len(rows))
+        with self._lock:
+            self.written += len(rows)
+        logger.debug("outstanding tokens: wrote %s in %.1fms", len(rows), elapsed)
+
+
+stats = IssuanceStats()
+writer = OutstandingTokenWriter(
+    batch_size=settings.TOKEN_OUTSTANDING_BATCH_SIZE,
+    flush_interval=settings.TOKEN_OUTSTANDING_FLUSH_INTERVAL,
+)
+
+
+def issue_tokens(user):
+    """
+    Sign one refresh/access pair for ``user``; the access token is derived from the
+    refresh token, so the two always belong together. The outstanding-token row is
+    queued for the writer once the current transaction commits.
+    """
+    started = time.perf_counter()
+    refresh = CachedBlacklistRefreshToken()
+    user_id = getattr(user, api_settings.USER_ID_FIELD)
+    refresh[api_settings.USER_ID_CLAIM] = user_id if isinstance(user_id, int) else str(user_id)
+    if api_settings.CHECK_REVOKE_TOKEN:
+        refresh[api_settings.REVOKE_TOKEN_CLAIM] = get_md5_hash_password(user.password)
+    tokens = {
+        'access': str(refresh.access_token),
+        'refresh_token': str(refresh),
+    }
+    stats.sign.append((time.perf_counter() - started) * 1000)
+
+    row = OutstandingToken(
+        user_id=user.pk,
+        jti=refresh[api_settings.JTI_CLAIM],
+        token=tokens['refresh_token'],
+        created_at=refresh.current_time,
+        expires_at=datetime_from_epoch(refresh['exp']),
+    )
+    transaction.on_commit(lambda: writer.add(row))
+    return tokens
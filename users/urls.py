@@ -1,7 +1,8 @@
 from django.urls import path
 
 from users.views import CreateUserAPIView, VerifyAPIView, GetNewVerificationAPIView, ChangeUserInfoAPIView, \
-    ChangeUserImageAPIView, LoginView, LoginRefreshView, LogOutView, ForgetPasswordView, ResetPasswordView
+    ChangeUserImageAPIView, LoginView, LoginRefreshView, LogOutView, ForgetPasswordView, ResetPasswordView, \
+    FollowAPIView
 
 urlpatterns = [
     path('login/', LoginView.as_view()),
@@ -14,4 +15,5 @@ urlpatterns = [
     path('new-verify/', GetNewVerificationAPIView.as_view()),
     path('change-user/', ChangeUserInfoAPIView.as_view()),
     path('change-user-photo/', ChangeUserImageAPIView.as_view()),
+    path('<uuid:pk>/follow/', FollowAPIView.as_view()),
 ]
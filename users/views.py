@@ -1,62 +1,81 @@
-from datetime import datetime
-
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
 from rest_framework import permissions, status
 from rest_framework.exceptions import ValidationError, NotFound
 from rest_framework.generics import CreateAPIView, UpdateAPIView
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.exceptions import TokenError
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
-from shared.utility import send_email, check_email_or_phone_number
+from post.timeline import backfill, remove_author, refill, left_celebrity, schedule
+from shared.throttling import ThrottleBeforeAuthMixin, AUTH_THROTTLE_CLASSES
+from shared.utility import send_email, check_email_or_phone_number, send_phone_code
+from users import otp
+from users.authentication import invalidate_cached_user
+from users.blacklist import CachedBlacklistRefreshToken
+from users.follows import toggle_follow
 from users.models import User
+from users.otp import consume_code, has_active_code
 from users.serializers import SignUpSerializer, ChangeUserInfoSerializer, ChangeUserPhotoSerializer, LoginSerializer, \
     LoginRefreshSerializer, LogoutSerializer, ForgetPasswordSerializer, ResetPasswordSerializer
 
 
-class CreateUserAPIView(CreateAPIView):
+class CreateUserAPIView(ThrottleBeforeAuthMixin, CreateAPIView):
     queryset = User.objects.all()
     permission_classes = (permissions.AllowAny,)
     serializer_class = SignUpSerializer
+    throttle_classes = AUTH_THROTTLE_CLASSES
+    throttle_scope = 'signup'
+    throttle_target_field = 'email_phone_number'
 
 
-class VerifyAPIView(APIView):
+class VerifyAPIView(ThrottleBeforeAuthMixin, APIView):
     permission_classes = (permissions.IsAuthenticated,)
+    throttle_classes = AUTH_THROTTLE_CLASSES
+    throttle_scope = 'verify'
 
     def post(self, request, *args, **kwargs):
         user = self.request.user
         code = self.request.data.get('code')
 
         self.check_verify(user, code)
+        tokens = user.token()
         return Response(data={
             "success": True,
             "auth_status": user.auth_status,
-            "access": user.token()['access'],
-            "refresh": user.token()["refresh_token"]
+            "access": tokens['access'],
+            "refresh": tokens["refresh_token"]
         }
         )
 
     @staticmethod
     def check_verify(user: User, code):
-        verifies = user.verify_codes.filter(expiration_time__gte=datetime.now(), code=code, is_confirmed=False)
-        if not verifies.exists():
+        result = consume_code(user, code)
+        if result == otp.LOCKED:
+            raise ValidationError(
+                {
+                    "status": False,
+                    "message": "Urinishlar soni tugadi, yangi kod oling"
+                }
+            )
+        if result != otp.VALID:
             raise ValidationError(
                 {
                     "status": False,
                     "message": "Tasdiqlash kodingiz xato yoki eskirgan"
                 }
             )
-        verifies.update(is_confirmed=True)
         if user.auth_status == User.AuthStatus.NEW:
             user.auth_status = User.AuthStatus.VERIFY_CODE
             user.save()
         return True
 
 
-class GetNewVerificationAPIView(APIView):
+class GetNewVerificationAPIView(ThrottleBeforeAuthMixin, APIView):
     permission_classes = (permissions.IsAuthenticated,)
+    throttle_classes = AUTH_THROTTLE_CLASSES
+    throttle_scope = 'new_verify'
 
     def get(self, request, *args, **kwargs):
         user = self.request.user
@@ -66,7 +85,7 @@ class GetNewVerificationAPIView(APIView):
             send_email(user.email, code)
         elif user.auth_type == User.AuthType.VIA_PHONE:
             code = user.create_verify_type(User.AuthType.VIA_PHONE)
-            send_email(user.phone_number, code)
+            send_phone_code(user.phone_number, code)
         else:
             raise ValidationError(
                 {
@@ -82,8 +101,7 @@ class GetNewVerificationAPIView(APIView):
 
     @staticmethod
     def check_verification(user: User):
-        verifies = user.verify_codes.filter(expiration_time__gte=datetime.now(), is_confirmed=False)
-        if verifies.exists():
+        if has_active_code(user):
             raise ValidationError(
                 {
                     "message": "Kodingiz hali ishlatish uchun yqroqli biroz kutib turing!"
@@ -145,8 +163,11 @@ class ChangeUserImageAPIView(APIView):
         )
 
 
-class LoginView(TokenObtainPairView):
+class LoginView(ThrottleBeforeAuthMixin, TokenObtainPairView):
     serializer_class = LoginSerializer
+    throttle_classes = AUTH_THROTTLE_CLASSES
+    throttle_scope = 'login'
+    throttle_target_field = 'user_input'
 
 
 class LoginRefreshView(TokenRefreshView):
@@ -158,12 +179,13 @@ class LogOutView(APIView):
     permission_classes = (permissions.IsAuthenticated,)
 
     def post(self, request, *args, **kwargs):
-        serializer = self.serializer_classes(data=self.request.data)
+        serializer = self.serializer_class(data=self.request.data)
         serializer.is_valid(raise_exception=True)
         try:
             refresh_token = self.request.data['refresh']
-            token = RefreshToken(refresh_token)
+            token = CachedBlacklistRefreshToken(refresh_token)
             token.blacklist()
+            invalidate_cached_user(request.user.pk)
             return Response(data={
                 "success": True,
                 "message": "You are logged out"
@@ -172,9 +194,12 @@ class LogOutView(APIView):
             return Response(status=status.HTTP_400_BAD_REQUEST)
 
 
-class ForgetPasswordView(APIView):
+class ForgetPasswordView(ThrottleBeforeAuthMixin, APIView):
     permission_classes = (permissions.AllowAny,)
     serializer_class = ForgetPasswordSerializer
+    throttle_classes = AUTH_THROTTLE_CLASSES
+    throttle_scope = 'forgot_password'
+    throttle_target_field = 'email_or_phone'
 
     def post(self, request, *args, **kwargs):
         serializer = self.serializer_class(data=self.request.data)
@@ -185,17 +210,18 @@ class ForgetPasswordView(APIView):
 
         if check_email_or_phone_number(email_or_phone) == 'phone':
             code = user.create_verify_type(User.AuthType.VIA_PHONE)
-            send_email(email_or_phone, code)
+            send_phone_code(email_or_phone, code)
         elif check_email_or_phone_number(email_or_phone) == 'email':
             code = user.create_verify_type(User.AuthType.VIA_EMAIL)
             send_email(email_or_phone, code)
 
+        tokens = user.token()
         return Response(
             {
                 "status": True,
                 "message": "Kod yuborildi",
-                "access": user.token()['access'],
-                "refresh_token": user.token()['refresh_token'],
+                "access": tokens['access'],
+                "refresh_token": tokens['refresh_token'],
                 "auth_status": user.auth_status
             },
             status=200
@@ -217,12 +243,39 @@ class ResetPasswordView(UpdateAPIView):
         except ObjectDoesNotExist as e:
             raise NotFound(detail="User not found")
 
+        tokens = user.token()
         return Response(
             {
                 "success": True,
                 "message": "Password muvaffaqiyatli o'zgartirildi",
-                "access": user.token()['access'],
-                "refresh_token": user.token()['refresh_token'],
+                "access": tokens['access'],
+                "refresh_token": tokens['refresh_token'],
                 "auth_type": user.auth_type
             }
         )
+
+
+class FollowAPIView(APIView):
+    permission_classes = (permissions.IsAuthenticated,)
+
+    @transaction.atomic
+    def post(self, request, pk):
+        if pk == request.user.pk:
+            raise ValidationError({"message": "O'zingizga obuna bo'la olmaysiz"})
+        _, following = toggle_follow(request.user, pk)
+        followee = User.objects.only('follower_count').get(pk=pk)
+        if following:
+            schedule(backfill, request.user.pk, followee)
+        else:
+            schedule(remove_author, request.user.pk, pk)
+            if left_celebrity(followee):
+                schedule(refill, pk)
+        return Response(
+            {
+                "success": True,
+                "message": "Obuna bo'ldingiz" if following else "Obunadan chiqdingiz",
+                "following": following,
+                "follower_count": followee.follower_count,
+            },
+            status=status.HTTP_201_CREATED if following else status.HTTP_200_OK
+        )